@@ -1,3 +1,3 @@
-from .base import Delta
+from .base import Delta, DeltaBuilder
 
 __version__ = '1.0.1'
\ No newline at end of file
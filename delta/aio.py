@@ -0,0 +1,100 @@
+"""
+asyncio wrappers that run CPU heavy Delta work off the event loop.
+
+Calls on small deltas run inline, where handing them to a pool would cost
+more than the work itself: ``compose`` and ``transform`` below ``threshold``
+ops, ``diff`` and ``render``, whose cost follows the text, below
+``length_threshold`` characters.  Larger ones go to ``executor``: ``None``
+means the loop's default thread pool; pass a
+``concurrent.futures.ProcessPoolExecutor`` to use other cores.
+
+``timeout`` raises ``asyncio.TimeoutError`` when the result isn't ready in
+time.  Cancelling (or timing out) stops waiting for the result, but a call
+that already started in a pool runs to completion there.
+"""
+import asyncio
+import functools
+
+from .base import Delta
+
+
+THRESHOLD = 200
+LENGTH_THRESHOLD = 20000
+
+executor = None
+threshold = THRESHOLD
+length_threshold = LENGTH_THRESHOLD
+
+
+def configure(pool=None, min_ops=THRESHOLD, min_length=LENGTH_THRESHOLD):
+    """
+    Set the default executor and inline thresholds for all wrappers.
+    """
+    global executor, threshold, length_threshold
+    executor = pool
+    threshold = min_ops
+    length_threshold = min_length
+
+
+def size_of(*deltas):
+    return sum(len(getattr(d, 'ops', d)) for d in deltas)
+
+
+def length_of(*deltas):
+    return sum(len(d) for d in deltas)
+
+
+async def run(fn, *args, size=None, length=None, timeout=None, pool=None, min_ops=None, min_length=None):
+    """
+    Call ``fn(*args)`` inline if the ``size`` in ops and ``length`` in
+    characters given are below their thresholds, otherwise in the executor,
+    and return its result.
+    """
+    if min_ops is None:
+        min_ops = threshold
+    if min_length is None:
+        min_length = length_threshold
+    small = size is not None or length is not None
+    if small and (size is None or size < min_ops) and (length is None or length < min_length):
+        return fn(*args)
+    loop = asyncio.get_event_loop()
+    future = loop.run_in_executor(pool or executor, functools.partial(fn, *args))
+    if timeout is not None:
+        return await asyncio.wait_for(future, timeout)
+    return await future
+
+
+def _compose_many(deltas):
+    """
+    Compose a sequence of deltas from left to right.
+    """
+    result = Delta()
+    for delta in deltas:
+        result = result.compose(delta)
+    return result
+
+
+def _render(delta, method, pretty):
+    from . import html
+    return html.render(delta, method, pretty)
+
+
+async def compose(a, b, **kwargs):
+    return await run(Delta.compose, a, b, size=size_of(a, b), **kwargs)
+
+
+async def compose_many(deltas, **kwargs):
+    deltas = list(deltas)
+    return await run(_compose_many, deltas, size=size_of(*deltas), **kwargs)
+
+
+async def transform(a, b, priority=False, **kwargs):
+    return await run(Delta.transform, a, b, priority, size=size_of(a, b), **kwargs)
+
+
+async def diff(a, b, **kwargs):
+    return await run(Delta.diff, a, b, length=length_of(a, b), **kwargs)
+
+
+async def render(delta, method='html', pretty=False, **kwargs):
+    return await run(_render, delta, method, pretty, length=length_of(delta), **kwargs)
@@ -0,0 +1,135 @@
+import mmap
+import struct
+
+from .binary import Encoder, Decoder, DecodeError, write_string, write_varint, read_string, read_varint
+
+
+MAGIC = b'QDA1'
+HEADER = struct.Struct('<4sQ')
+
+
+class Writer(object):
+    """
+    Packs many deltas into one archive file.
+
+    Deltas are written in the binary wire format as they are added, each one
+    with its own key table so it can be decoded on its own.  ``close()``
+    appends the index of ``key -> (offset, length)`` and records its offset in
+    the header.
+    """
+    def __init__(self, path):
+        self.file = open(path, 'wb')
+        self.file.write(HEADER.pack(MAGIC, 0))
+        self.index = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def add(self, key, delta):
+        if key in self.index:
+            raise KeyError("duplicate key: %r" % key)
+        data = Encoder().encode(delta)
+        self.index[key] = (self.file.tell(), len(data))
+        self.file.write(data)
+
+    def close(self):
+        if self.file.closed:
+            return
+        index_offset = self.file.tell()
+        out = bytearray()
+        write_varint(out, len(self.index))
+        for key, (offset, length) in self.index.items():
+            write_string(out, key)
+            write_varint(out, offset)
+            write_varint(out, length)
+        self.file.write(out)
+        self.file.seek(0)
+        self.file.write(HEADER.pack(MAGIC, index_offset))
+        self.file.close()
+
+
+class Reader(object):
+    """
+    Random access to an archive through a memory map.
+
+    Only the index is read up front; ``reader[key]`` decodes just that
+    document's bytes straight out of the mapping, and iterating yields
+    ``(key, delta)`` pairs one document at a time.
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self.mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.view = memoryview(self.mmap)
+        try:
+            magic, index_offset = HEADER.unpack_from(self.view, 0)
+        except struct.error:
+            magic = None
+        if magic != MAGIC or not index_offset:
+            self.close()
+            raise DecodeError("not a delta archive: %r" % path)
+        self.index = self.read_index(index_offset)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_index(self, pos):
+        index = {}
+        count, pos = read_varint(self.view, pos)
+        for _ in range(count):
+            key, pos = read_string(self.view, pos)
+            offset, pos = read_varint(self.view, pos)
+            length, pos = read_varint(self.view, pos)
+            index[key] = (offset, length)
+        return index
+
+    def __len__(self):
+        return len(self.index)
+
+    def __contains__(self, key):
+        return key in self.index
+
+    def keys(self):
+        return self.index.keys()
+
+    def __getitem__(self, key):
+        offset, length = self.index[key]
+        delta, end = Decoder().decode_from(self.view, offset)
+        if end != offset + length:
+            raise DecodeError("corrupt archive entry: %r" % key)
+        return delta
+
+    def get(self, key, default=None):
+        if key not in self.index:
+            return default
+        return self[key]
+
+    def __iter__(self):
+        for key in sorted(self.index, key=lambda k: self.index[k][0]):
+            yield key, self[key]
+
+    def close(self):
+        if self.view is not None:
+            self.view.release()
+            self.view = None
+            self.mmap.close()
+
+
+def write(path, deltas):
+    """
+    Write an archive from a mapping or an iterable of ``(key, delta)``.
+    """
+    if hasattr(deltas, 'items'):
+        deltas = deltas.items()
+    with Writer(path) as writer:
+        for key, delta in deltas:
+            writer.add(key, delta)
+
+
+def open_archive(path):
+    return Reader(path)
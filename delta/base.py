@@ -1,4 +1,5 @@
 import copy
+import time
 import diff_match_patch
 
 try:
@@ -6,7 +7,9 @@ try:
 except:
     pass
 
-from . import op
+from . import op, metrics
+from .index import OffsetIndex
+from .embed import intern as intern_embed
 
 
 NULL_CHARACTER = chr(0)
@@ -21,7 +24,13 @@ def merge(a, b):
 def differ(a, b, timeout=1):
     differ = diff_match_patch.diff_match_patch()
     differ.Diff_Timeout = timeout
-    return differ.diff_main(a, b)
+    if not metrics.enabled:
+        return differ.diff_main(a, b)
+    start = time.perf_counter()
+    diffs = differ.diff_main(a, b)
+    if timeout > 0 and time.perf_counter() - start >= timeout:
+        metrics.incr('diff.timeouts')
+    return diffs
 
 def smallest(*parts):
     return min(filter(lambda x: x is not None, parts))
@@ -40,10 +49,75 @@ class Delta(object):
     def __repr__(self):
         return "{}({})".format(self.__class__.__name__, self.ops)
 
+    @classmethod
+    def from_ops(cls, ops):
+        """
+        Builds a canonical delta from any list of ops in one pass: adjacent
+        compatible ops are merged, empty ones dropped and inserts moved in
+        front of deletes, just like pushing them one by one would do.
+
+        Unlike ``push()`` nothing is deep copied: the new ops get their own
+        attribute dicts, but attribute values are shared with ``ops`` and
+        embeds are interned.
+        """
+        if hasattr(ops, 'ops'):
+            ops = ops.ops
+        result = []
+        # Text merged into an op is collected here and joined once at the end
+        fragments = {}
+        for operator in ops:
+            typ = op.type(operator)
+            if typ is None or not op.length(operator):
+                continue
+            if typ == 'delete':
+                new_op = {'delete': operator['delete']}
+            else:
+                new_op = {typ: intern_embed(operator[typ])}
+                if operator.get('attributes'):
+                    new_op['attributes'] = dict(operator['attributes'])
+
+            if not result:
+                result.append(new_op)
+                continue
+
+            index = len(result)
+            last_op = result[-1]
+            if typ == 'delete' and 'delete' in last_op:
+                last_op['delete'] += new_op['delete']
+                continue
+
+            if 'delete' in last_op and typ == 'insert':
+                index -= 1
+                if index == 0:
+                    result.insert(0, new_op)
+                    continue
+                last_op = result[index - 1]
+
+            if new_op.get('attributes') == last_op.get('attributes'):
+                if isinstance(new_op.get('insert'), str) and isinstance(last_op.get('insert'), str):
+                    parts = fragments.get(id(last_op))
+                    if parts is None:
+                        parts = fragments[id(last_op)] = [last_op['insert']]
+                    parts.append(new_op['insert'])
+                    continue
+
+                if isinstance(new_op.get('retain'), int) and isinstance(last_op.get('retain'), int):
+                    last_op['retain'] += new_op['retain']
+                    continue
+
+            result.insert(index, new_op)
+
+        if fragments:
+            for operator in result:
+                parts = fragments.get(id(operator))
+                if parts is not None:
+                    operator['insert'] = "".join(parts)
+        return cls(result)
+
     def insert(self, text, **attrs):
         if text == "":
             return self
-        new_op = {'insert': text}
+        new_op = {'insert': intern_embed(text)}
         if attrs:
             new_op['attributes'] = attrs
         return self.push(new_op)
@@ -62,6 +136,7 @@ class Delta(object):
         return self.push(new_op)
 
     def push(self, operation):
+        self._index = None
         index = len(self.ops)
         new_op = copy.deepcopy(operation)
         try:
@@ -72,6 +147,8 @@ class Delta(object):
         
         if op.type(new_op) == op.type(last_op) == 'delete':
             last_op['delete'] += new_op['delete']
+            if metrics.enabled:
+                metrics.incr('push.merges')
             return self
 
         if op.type(last_op) == 'delete' and op.type(new_op) == 'insert':
@@ -85,10 +162,14 @@ class Delta(object):
         if new_op.get('attributes') == last_op.get('attributes'):
             if isinstance(new_op.get('insert'), str) and isinstance(last_op.get('insert'), str):
                 last_op['insert'] += new_op['insert']
+                if metrics.enabled:
+                    metrics.incr('push.merges')
                 return self
 
             if isinstance(new_op.get('retain'), int) and isinstance(last_op.get('retain'), int):
                 last_op['retain'] += new_op['retain']
+                if metrics.enabled:
+                    metrics.incr('push.merges')
                 return self
 
         self.ops.insert(index, new_op)
@@ -109,6 +190,7 @@ class Delta(object):
         return delta
 
     def chop(self):
+        self._index = None
         try:
             last_op = self.ops[-1]
             if op.type(last_op) == 'retain' and not last_op.get('attributes'):
@@ -117,6 +199,34 @@ class Delta(object):
             pass
         return self
 
+    def offset_index(self):
+        """
+        Returns an ``OffsetIndex`` of this document, cached until the delta
+        is changed through ``push()``, ``extend()`` or ``chop()``, also by
+        another delta sharing its ops.  Ops edited in place other than the
+        last one aren't noticed.
+        """
+        index = self.__dict__.get('_index')
+        if index is None or not index.valid_for(self.ops):
+            index = self._index = OffsetIndex(self.ops)
+        return index
+
+    def search(self, pattern, regex=False, flags=0):
+        """
+        Returns the matches of ``pattern`` in the text of this document as
+        ``(start, end, text, attributes)`` tuples, where ``attributes`` are
+        the formats active across the whole match.  ``pattern`` is a plain
+        string unless ``regex`` is true.
+        """
+        return list(self.offset_index().search(pattern, regex, flags))
+
+    def get_format(self, index, length=0):
+        """
+        Returns the ``(common, partial, line)`` formats of a range of this
+        document, see ``OffsetIndex.formats()``.
+        """
+        return self.offset_index().formats(index, length)
+
     def document(self):
         parts = []
         for op in self:
@@ -156,14 +266,14 @@ class Delta(object):
             if stop is not None and index >= stop:
                 break
             if index < start:
-                next_op = iter.next(start - index)
+                index += iter.take(start - index)[1]
             else:
                 if stop is not None:
                     next_op = iter.next(stop-index)
                 else:
                     next_op = iter.next()
                 ops.append(next_op)
-            index += op.length(next_op)
+                index += op.length(next_op)
 
         return Delta(ops)
 
@@ -186,9 +296,26 @@ class Delta(object):
         return sum(op.length(o) for o in self)
 
     def compose(self, other):
+        if metrics.enabled:
+            metrics.incr('compose.calls')
+            metrics.incr('compose.ops', len(self.ops) + len(other.ops))
         self_it = self.iterator()
         other_it = other.iterator()
-        delta = self.__class__()
+
+        # Copy the part of the document covered by a leading plain retain
+        # as is, instead of composing it op by op.
+        prefix = []
+        first_other = other_it.peek()
+        if other_it.peek_type() == 'retain' and first_other is not None and not first_other.get('attributes'):
+            first_left = first_other['retain']
+            while self_it.peek_type() == 'insert' and self_it.peek_length() <= first_left:
+                first_left -= self_it.peek_length()
+                prefix.append(op.clone(self_it.peek()))
+                self_it.take()
+            if first_other['retain'] - first_left > 0:
+                other_it.take(first_other['retain'] - first_left)
+        delta = DeltaBuilder(self.__class__, prefix)
+
         while self_it.has_next() or other_it.has_next():
             if other_it.peek_type() == 'insert':
                 delta.push(other_it.next())
@@ -196,30 +323,38 @@ class Delta(object):
                 delta.push(self_it.next())
             else:
                 length = smallest(self_it.peek_length(), other_it.peek_length())
-                self_op = self_it.next(length)
-                other_op = other_it.next(length)
-                if 'retain' in other_op:
+                self_type, self_length, self_attributes, self_insert, self_offset = self_it.take(length)
+                other_type, _, other_attributes, _, _ = other_it.take(length)
+                if other_type == 'retain':
                     new_op = {}
-                    if 'retain' in self_op:
+                    if self_type == 'retain':
                         new_op['retain'] = length
-                    elif 'insert' in self_op:
-                        new_op['insert'] = self_op['insert']
+                    else:
+                        new_op['insert'] = op.slice_insert(self_insert, self_offset, length)
                     # Preserve null when composing with a retain, otherwise remove it for inserts
-                    attributes = op.compose(self_op.get('attributes'), other_op.get('attributes'), isinstance(self_op.get('retain'), int))
+                    attributes = op.compose(self_attributes, other_attributes, self_type == 'retain' and self_length is not None)
                     if (attributes):
                         new_op['attributes'] = attributes
                     delta.push(new_op)
+
+                    # Once the change is used up the rest of the document
+                    # is unchanged, so copy it over as is.
+                    if not other_it.has_next() and delta.last() == new_op:
+                        return delta.extend(self_it.rest()).chop().build()
                 # Other op should be delete, we could be an insert or retain
                 # Insert + delete cancels out
-                elif op.type(other_op) == 'delete' and 'retain' in self_op:
-                    delta.push(other_op)
-        return delta.chop()
+                elif other_type == 'delete' and self_type == 'retain':
+                    delta.push({'delete': length})
+        return delta.chop().build()
     
     def diff(self, other):
         """
         Returns a diff of two *documents*, which is defined as a delta
         with only inserts. 
         """
+        if metrics.enabled:
+            metrics.incr('diff.calls')
+            metrics.incr('diff.ops', len(self.ops) + len(other.ops))
         if self.ops == other.ops:
             return self.__class__()
         
@@ -228,7 +363,7 @@ class Delta(object):
         self_it = self.iterator()
         other_it = other.iterator()
         
-        delta = self.__class__()
+        delta = DeltaBuilder(self.__class__)
         for code, text in differ(self_doc, other_doc):
             length = len(text)
             while length > 0:
@@ -238,23 +373,57 @@ class Delta(object):
                     delta.push(other_it.next(op_length))
                 elif code == DIFF_DELETE:
                     op_length = min(length, self_it.peek_length())
-                    self_it.next(op_length)
+                    self_it.take(op_length)
                     delta.delete(op_length)
                 elif code == DIFF_EQUAL:
                     op_length = min(self_it.peek_length(), other_it.peek_length(), length)
-                    self_op = self_it.next(op_length)
-                    other_op = other_it.next(op_length)
-                    if self_op.get('insert') == other_op.get('insert'):
-                        attributes = op.diff(self_op.get('attributes'), other_op.get('attributes'))
+                    _, _, self_attributes, self_insert, _ = self_it.take(op_length)
+                    other_type, _, other_attributes, other_insert, other_offset = other_it.take(op_length)
+                    # The diff already matched the text, so two strings are
+                    # equal here; only embeds need comparing.
+                    if isinstance(self_insert, str):
+                        equal = isinstance(other_insert, str)
+                    else:
+                        equal = not isinstance(other_insert, str) and self_insert == other_insert
+                    if equal:
+                        attributes = op.diff(self_attributes, other_attributes)
                         delta.retain(op_length, **(attributes or {}))
                     else:
-                        delta.push(other_op).delete(op_length)
+                        delta.push(op.make(other_type, op_length, other_attributes, other_insert, other_offset)).delete(op_length)
                 else:
                     raise RuntimeError("Diff library returned unknown op code: %r", code)
                 if op_length == 0:
                     return
                 length -= op_length
-        return delta.chop()
+        return delta.chop().build()
+
+    def invert(self, base):
+        """
+        Returns the delta that undoes this change when applied to the
+        document that results from composing ``base`` with it.
+        """
+        base_it = base.iterator()
+        inverted = self.__class__()
+        for operator in self:
+            if 'insert' in operator:
+                inverted.delete(op.length(operator))
+            elif 'retain' in operator and not operator.get('attributes'):
+                inverted.retain(operator['retain'])
+                # a retain can span several base ops
+                length = operator['retain']
+                while length > 0 and base_it.has_next():
+                    length -= base_it.take(length)[1]
+            else:
+                length = op.length(operator)
+                while length > 0 and base_it.has_next():
+                    base_op = base_it.next(length)
+                    length -= op.length(base_op)
+                    if 'delete' in operator:
+                        inverted.push(base_op)
+                    else:
+                        attributes = op.invert(operator['attributes'], base_op.get('attributes'))
+                        inverted.retain(op.length(base_op), **(attributes or {}))
+        return inverted.chop()
 
     def each_line(self, fn, newline='\n'):
         for line, attributes, index in self.iter_lines():
@@ -263,7 +432,7 @@ class Delta(object):
 
     def iter_lines(self, newline='\n'):
         iter = self.iterator()
-        line = self.__class__()
+        line = DeltaBuilder(self.__class__)
         i = 0
         while iter.has_next():
             if iter.peek_type() != 'insert':
@@ -280,47 +449,56 @@ class Delta(object):
             elif index > 0:
                 line.push(iter.next(index))
             else:
-                yield line, iter.next(1).get('attributes', {}), i
+                yield line.build(), iter.next(1).get('attributes', {}), i
                 i += 1
-                line = Delta()
-        if len(line) > 0:
-            yield line, {}, i
+                line = DeltaBuilder(self.__class__)
+        if line.ops:
+            yield line.build(), {}, i
 
     def transform(self, other, priority=False):
         if isinstance(other, int):
             return self.transform_position(other, priority)
+        if metrics.enabled:
+            metrics.incr('transform.calls')
+            metrics.incr('transform.ops', len(self.ops) + len(other.ops))
 
         self_it = self.iterator()
         other_it = other.iterator()
-        delta = Delta()
+        delta = DeltaBuilder()
 
-        while self_it.has_next() or other_it.has_next():
+        while other_it.has_next():
+            if not self_it.has_next():
+                # Nothing left on our side: the rest of their ops go through as is
+                delta.extend(other_it.rest())
+                break
             if self_it.peek_type() == 'insert' and (priority or other_it.peek_type() != 'insert'):
-                delta.retain(op.length(self_it.next()))
+                delta.retain(self_it.take()[1])
             elif other_it.peek_type() == 'insert':
                 delta.push(other_it.next())
             else:
                 length = smallest(self_it.peek_length(), other_it.peek_length())
-                self_op = self_it.next(length)
-                other_op = other_it.next(length)
-                if self_op.get('delete'):
+                self_type, _, self_attributes, _, _ = self_it.take(length)
+                other_type, _, other_attributes, _, _ = other_it.take(length)
+                if self_type == 'delete':
                     # Our delete either makes their delete redundant or removes their retain
                     continue
-                elif other_op.get('delete'):
-                    delta.push(other_op)
+                elif other_type == 'delete':
+                    delta.push({'delete': length})
+                elif not self_attributes and not other_attributes:
+                    delta.retain(length)
                 else:
                     # We retain either their retain or insert
-                    delta.retain(length, **(op.transform(self_op.get('attributes'), other_op.get('attributes'), priority) or {}))
+                    delta.retain(length, **(op.transform(self_attributes, other_attributes, priority) or {}))
 
-        return delta.chop()
+        # Once their ops are used up we would only add plain retains, which
+        # chop() removes again.
+        return delta.chop().build()
 
     def transform_position(self, index, priority=False):
         iter = self.iterator()
         offset = 0
         while iter.has_next() and offset <= index:
-            length = iter.peek_length()
-            next_type = iter.peek_type()
-            iter.next()
+            next_type, length, _, _, _ = iter.take()
             if next_type == 'delete':
                 index -= min(length, index - offset)
                 continue
@@ -328,3 +506,129 @@ class Delta(object):
                 index += length
             offset += length
         return index
+
+
+class DeltaBuilder(object):
+    """
+    Builds a delta op by op with the same merging rules as ``Delta.push()``,
+    but the text of merged inserts is collected in a list and joined once
+    by ``build()``, so building from many small fragments stays linear.
+
+    Pushed ops are not deep copied: each op and attribute dict is copied,
+    attribute values and embeds are shared.
+    """
+    def __init__(self, cls=Delta, ops=None):
+        self.cls = cls
+        self.ops = ops if ops is not None else []
+        self.fragments = {}
+
+    def insert(self, text, **attrs):
+        if text == "":
+            return self
+        new_op = {'insert': intern_embed(text)}
+        if attrs:
+            new_op['attributes'] = attrs
+        return self.push(new_op)
+
+    def delete(self, length):
+        if length <= 0:
+            return self
+        return self.push({'delete': length})
+
+    def retain(self, length, **attrs):
+        if length <= 0:
+            return self
+        new_op = {'retain': length}
+        if attrs:
+            new_op['attributes'] = attrs
+        return self.push(new_op)
+
+    def push(self, operation):
+        new_op = dict(operation)
+        if new_op.get('attributes'):
+            new_op['attributes'] = dict(new_op['attributes'])
+        index = len(self.ops)
+        try:
+            last_op = self.ops[index - 1]
+        except IndexError:
+            self.ops.append(new_op)
+            return self
+
+        new_type = op.type(new_op)
+        last_type = op.type(last_op)
+        if new_type == last_type == 'delete':
+            last_op['delete'] += new_op['delete']
+            if metrics.enabled:
+                metrics.incr('push.merges')
+            return self
+
+        if last_type == 'delete' and new_type == 'insert':
+            index -= 1
+            try:
+                last_op = self.ops[index - 1]
+            except IndexError:
+                self.ops.insert(0, new_op)
+                return self
+
+        if new_op.get('attributes') == last_op.get('attributes'):
+            if isinstance(new_op.get('insert'), str) and isinstance(last_op.get('insert'), str):
+                parts = self.fragments.get(id(last_op))
+                if parts is None:
+                    parts = self.fragments[id(last_op)] = [last_op['insert']]
+                parts.append(new_op['insert'])
+                if metrics.enabled:
+                    metrics.incr('push.merges')
+                return self
+
+            if isinstance(new_op.get('retain'), int) and isinstance(last_op.get('retain'), int):
+                last_op['retain'] += new_op['retain']
+                if metrics.enabled:
+                    metrics.incr('push.merges')
+                return self
+
+        self.ops.insert(index, new_op)
+        return self
+
+    def extend(self, ops):
+        if hasattr(ops, 'ops'):
+            ops = ops.ops
+        # Push until an op lands at the end as is: the ones after it can't
+        # merge with anything before, so they are appended directly.
+        for i, operation in enumerate(ops):
+            count = len(self.ops)
+            self.push(operation)
+            if len(self.ops) > count and op.type(self.ops[-1]) == op.type(operation):
+                self.ops.extend(ops[i + 1:])
+                break
+        return self
+
+    def flush(self):
+        """
+        Join the collected text into the ops.
+        """
+        if self.fragments:
+            for operator in self.ops:
+                parts = self.fragments.get(id(operator))
+                if parts is not None:
+                    operator['insert'] = "".join(parts)
+            self.fragments = {}
+        return self
+
+    def last(self):
+        if not self.ops:
+            return None
+        self.flush()
+        return self.ops[-1]
+
+    def chop(self):
+        try:
+            last_op = self.ops[-1]
+            if op.type(last_op) == 'retain' and not last_op.get('attributes'):
+                self.ops.pop()
+        except IndexError:
+            pass
+        return self
+
+    def build(self):
+        self.flush()
+        return self.cls(self.ops)
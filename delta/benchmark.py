@@ -0,0 +1,246 @@
+"""
+Benchmarks for the core Delta operations across document sizes.
+
+Run with ``python -m delta.benchmark``; ``--json`` writes machine readable
+results and ``--compare`` prints the ratio against a previous run.
+"""
+import argparse
+import asyncio
+import json
+import random
+import string
+import sys
+import timeit
+
+from .base import Delta
+
+
+ATTRIBUTES = [{'bold': True}, {'italic': True}, {'link': 'https://quilljs.com'}, {'color': '#ff0000'}]
+LINE_ATTRIBUTES = [{'header': 1}, {'list': 'bullet'}, {'align': 'center'}]
+
+
+def random_text(rng, length):
+    return ''.join(' ' if rng.random() < 0.15 else rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def generate_document(size, fragment=50, line=200, seed=0):
+    """
+    Return a document delta of about ``size`` characters, made of formatted
+    runs of about ``fragment`` characters and lines of about ``line``
+    characters.  A smaller ``fragment`` gives a more fragmented document.
+    """
+    rng = random.Random(seed)
+    delta = Delta()
+    length = 0
+    next_line = rng.randint(1, line * 2)
+    while length < size:
+        run = min(rng.randint(1, fragment * 2), size - length, next_line)
+        attributes = rng.choice(ATTRIBUTES) if rng.random() < 0.5 else {}
+        if rng.random() < 0.01:
+            delta.insert({'image': 'https://quilljs.com/image.png'})
+            run = 1
+        else:
+            delta.insert(random_text(rng, run), **attributes)
+        length += run
+        next_line -= run
+        if next_line <= 0:
+            attributes = rng.choice(LINE_ATTRIBUTES) if rng.random() < 0.3 else {}
+            delta.insert('\n', **attributes)
+            length += 1
+            next_line = rng.randint(1, line * 2)
+    return delta.insert('\n')
+
+
+def generate_change(document, seed=0):
+    """
+    Return a small random edit (insert, delete or format) of ``document``.
+    """
+    rng = random.Random(seed)
+    length = len(document)
+    index = rng.randint(0, max(length - 2, 0))
+    kind = rng.choice(['insert', 'delete', 'format'])
+    change = Delta().retain(index)
+    if kind == 'insert':
+        return change.insert(random_text(rng, rng.randint(1, 10)))
+    span = min(rng.randint(1, 20), length - 1 - index)
+    if kind == 'delete':
+        return change.delete(span)
+    return change.retain(span, bold=True)
+
+
+def bench_push(document):
+    ops = document.ops
+    def run():
+        delta = Delta()
+        for op in ops:
+            delta.push(op)
+    return run
+
+
+def bench_compose(document):
+    change = generate_change(document, 1)
+    return lambda: document.compose(change)
+
+
+def bench_transform(document):
+    a = generate_change(document, 1)
+    b = generate_change(document, 2)
+    return lambda: a.transform(b, True)
+
+
+def bench_transform_position(document):
+    change = document.compose(generate_change(document, 1))
+    index = len(document) // 2
+    return lambda: change.transform_position(index)
+
+
+def bench_diff(document):
+    other = document.compose(generate_change(document, 1))
+    return lambda: document.diff(other)
+
+
+def bench_getitem(document):
+    start = len(document) // 2
+    return lambda: document[start:start + 10]
+
+
+def bench_iter_lines(document):
+    return lambda: list(document.iter_lines())
+
+
+def bench_render(document):
+    from . import html
+    return lambda: html.render(document)
+
+
+def bench_pipeline(document):
+    from . import pipeline
+    return lambda: pipeline.run(
+        document, html=pipeline.HtmlSink(), text=pipeline.TextSink(),
+        tokens=pipeline.TokenSink(), stats=pipeline.StatsSink())
+
+
+def bench_session(document, editors=8, edits=20):
+    from .session import Session
+
+    async def edit(session, client):
+        for i in range(edits):
+            revision = session.revision
+            await session.submit(client, revision, Delta().retain(i % 5).insert('x'))
+
+    async def main():
+        session = Session('bench', document)
+        session.start()
+        await asyncio.gather(*[edit(session, 'client-%d' % i) for i in range(editors)])
+        await session.stop()
+
+    def run():
+        loop = asyncio.new_event_loop()
+        try:
+            loop.run_until_complete(main())
+        finally:
+            loop.close()
+    return run
+
+
+CASES = {
+    'push': bench_push,
+    'compose': bench_compose,
+    'transform': bench_transform,
+    'transform_position': bench_transform_position,
+    'diff': bench_diff,
+    'getitem': bench_getitem,
+    'iter_lines': bench_iter_lines,
+    'render': bench_render,
+    'pipeline': bench_pipeline,
+    'session': bench_session,
+}
+
+
+def measure(fn, repeat=5, min_time=0.05):
+    """
+    Return the best time of one call over ``repeat`` rounds, each round
+    calling ``fn`` enough times to run for at least ``min_time`` seconds.
+    """
+    timer = timeit.Timer(fn)
+    number = 1
+    while True:
+        elapsed = timer.timeit(number)
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 2
+    return min([elapsed] + timer.repeat(repeat - 1, number)) / number
+
+
+def run(cases=None, sizes=(1000, 10000, 100000), fragments=(50, 5), repeat=5, min_time=0.05):
+    """
+    Run every case against documents of each size and fragmentation and
+    return a list of result dicts.
+    """
+    results = []
+    for name in cases or sorted(CASES):
+        for size in sizes:
+            for fragment in fragments:
+                document = generate_document(size, fragment)
+                try:
+                    fn = CASES[name](document)
+                except ImportError as e:
+                    results.append({'case': name, 'size': size, 'fragment': fragment, 'skipped': str(e)})
+                    break
+                seconds = measure(fn, repeat, min_time)
+                results.append({
+                    'case': name,
+                    'size': size,
+                    'fragment': fragment,
+                    'ops': len(document.ops),
+                    'seconds': seconds,
+                })
+    return results
+
+
+def key(result):
+    return (result['case'], result['size'], result['fragment'])
+
+
+def report(results, baseline=None, out=sys.stdout):
+    previous = dict((key(r), r) for r in baseline or [] if 'seconds' in r)
+    for result in results:
+        if 'skipped' in result:
+            out.write("%-20s skipped: %s\n" % (result['case'], result['skipped']))
+            continue
+        line = "%-20s size=%-8d fragment=%-4d ops=%-7d %12.3f us" % (
+            result['case'], result['size'], result['fragment'], result['ops'], result['seconds'] * 1e6)
+        before = previous.get(key(result))
+        if before:
+            line += "  x%.2f" % (result['seconds'] / before['seconds'])
+        out.write(line + "\n")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m delta.benchmark', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('cases', nargs='*', help="cases to run (default: all): %s" % ", ".join(sorted(CASES)))
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000])
+    parser.add_argument('--fragments', type=int, nargs='+', default=[50, 5], help="average characters per op")
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--min-time', type=float, default=0.05)
+    parser.add_argument('--json', metavar='PATH', help="write results as JSON")
+    parser.add_argument('--compare', metavar='PATH', help="JSON results of a previous run to compare with")
+    args = parser.parse_args(argv)
+    for name in args.cases:
+        if name not in CASES:
+            parser.error("unknown case: %s" % name)
+
+    results = run(args.cases, args.sizes, args.fragments, args.repeat, args.min_time)
+    baseline = None
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)['results']
+    report(results, baseline)
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump({'results': results}, f, indent=2)
+    return results
+
+
+if __name__ == '__main__':
+    main()
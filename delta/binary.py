@@ -0,0 +1,289 @@
+"""
+Compact binary encoding for deltas.
+
+A message is the magic ``b'QD'``, a version byte, the number of ops as a
+varint and then the ops.  Every op starts with a tag byte: the low bits say
+what kind of op it is and ``HAS_ATTRIBUTES`` whether an attribute map
+follows.  Attribute and embed keys are not repeated: the first time a key is
+seen it is written out and given the next number in a key table, afterwards
+only that number is written.  The table lives for one message with the
+module level ``encode``/``decode``, or for a whole stream with a shared
+``Encoder``/``Decoder`` pair.
+"""
+import struct
+
+from .base import Delta
+
+
+MAGIC = b'QD'
+VERSION = 1
+
+INSERT_TEXT = 0
+INSERT_EMBED = 1
+RETAIN = 2
+DELETE = 3
+HAS_ATTRIBUTES = 0x80
+
+NONE = 0
+TRUE = 1
+FALSE = 2
+INT = 3
+FLOAT = 4
+STRING = 5
+LIST = 6
+MAP = 7
+
+DOUBLE = struct.Struct('<d')
+
+
+class DecodeError(ValueError):
+    pass
+
+
+def write_varint(out, value):
+    while value > 0x7f:
+        out.append((value & 0x7f) | 0x80)
+        value >>= 7
+    out.append(value)
+
+
+def read_varint(buf, pos):
+    result = 0
+    shift = 0
+    while True:
+        try:
+            byte = buf[pos]
+        except IndexError:
+            raise DecodeError("truncated varint")
+        pos += 1
+        result |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return result, pos
+        shift += 7
+
+
+def write_string(out, value):
+    data = value.encode('utf-8')
+    write_varint(out, len(data))
+    out.extend(data)
+
+
+def read_string(buf, pos):
+    length, pos = read_varint(buf, pos)
+    end = pos + length
+    if end > len(buf):
+        raise DecodeError("truncated string")
+    try:
+        return str(buf[pos:end], 'utf-8'), end
+    except UnicodeDecodeError as e:
+        raise DecodeError("invalid utf-8: %s" % e)
+
+
+class Encoder(object):
+    """
+    Encodes deltas, remembering attribute keys across calls.  Keys first
+    seen in a message are only remembered once all of it is encoded.
+    """
+    def __init__(self):
+        self.keys = {}
+        self.new_keys = {}
+
+    def encode(self, delta):
+        out = bytearray(MAGIC)
+        out.append(VERSION)
+        self.new_keys = {}
+        try:
+            self.write_ops(out, getattr(delta, 'ops', delta))
+            self.keys.update(self.new_keys)
+        finally:
+            self.new_keys = {}
+        return bytes(out)
+
+    def write_ops(self, out, ops):
+        write_varint(out, len(ops))
+        for op in ops:
+            attributes = op.get('attributes')
+            flag = HAS_ATTRIBUTES if attributes else 0
+            if isinstance(op.get('delete'), int):
+                out.append(DELETE | flag)
+                write_varint(out, op['delete'])
+            elif isinstance(op.get('retain'), int):
+                out.append(RETAIN | flag)
+                write_varint(out, op['retain'])
+            elif isinstance(op.get('insert'), str):
+                out.append(INSERT_TEXT | flag)
+                write_string(out, op['insert'])
+            elif 'insert' in op:
+                out.append(INSERT_EMBED | flag)
+                self.write_value(out, op['insert'])
+            else:
+                raise ValueError("cannot encode op: %r" % op)
+            if flag:
+                self.write_map(out, attributes)
+
+    def write_key(self, out, key):
+        index = self.keys.get(key)
+        if index is None:
+            index = self.new_keys.get(key)
+        if index is None:
+            self.new_keys[key] = len(self.keys) + len(self.new_keys)
+            out.append(0)
+            write_string(out, key)
+        else:
+            write_varint(out, index + 1)
+
+    def write_map(self, out, value):
+        write_varint(out, len(value))
+        for k, v in value.items():
+            self.write_key(out, k)
+            self.write_value(out, v)
+
+    def write_value(self, out, value):
+        if value is None:
+            out.append(NONE)
+        elif value is True:
+            out.append(TRUE)
+        elif value is False:
+            out.append(FALSE)
+        elif isinstance(value, int):
+            out.append(INT)
+            # zigzag, so small negative numbers stay small
+            write_varint(out, value * 2 if value >= 0 else -value * 2 - 1)
+        elif isinstance(value, float):
+            out.append(FLOAT)
+            out.extend(DOUBLE.pack(value))
+        elif isinstance(value, str):
+            out.append(STRING)
+            write_string(out, value)
+        elif isinstance(value, (list, tuple)):
+            out.append(LIST)
+            write_varint(out, len(value))
+            for item in value:
+                self.write_value(out, item)
+        elif isinstance(value, dict):
+            out.append(MAP)
+            self.write_map(out, value)
+        else:
+            raise ValueError("cannot encode value: %r" % (value,))
+
+
+class Decoder(object):
+    """
+    Decodes deltas produced by an ``Encoder``, mirroring its key table.
+    """
+    def __init__(self):
+        self.keys = []
+
+    def decode(self, data):
+        delta, pos = self.decode_from(data)
+        if pos != len(data):
+            raise DecodeError("trailing data after delta")
+        return delta
+
+    def decode_from(self, buf, pos=0):
+        """
+        Decode one message starting at ``pos`` of ``buf`` (any object
+        supporting the buffer protocol) and return ``(delta, end)``.
+        """
+        if bytes(buf[pos:pos + 2]) != MAGIC:
+            raise DecodeError("not a binary delta")
+        if len(buf) < pos + 3:
+            raise DecodeError("truncated header")
+        if buf[pos + 2] != VERSION:
+            raise DecodeError("unsupported version: %r" % buf[pos + 2])
+        known = len(self.keys)
+        try:
+            ops, pos = self.read_ops(memoryview(buf), pos + 3)
+        except DecodeError:
+            # forget the keys of a message that didn't decode, like the encoder
+            del self.keys[known:]
+            raise
+        return Delta(ops), pos
+
+    def read_ops(self, buf, pos):
+        count, pos = read_varint(buf, pos)
+        ops = []
+        for _ in range(count):
+            try:
+                tag = buf[pos]
+            except IndexError:
+                raise DecodeError("truncated op")
+            pos += 1
+            kind = tag & ~HAS_ATTRIBUTES
+            if kind == INSERT_TEXT:
+                value, pos = read_string(buf, pos)
+                op = {'insert': value}
+            elif kind == INSERT_EMBED:
+                value, pos = self.read_value(buf, pos)
+                op = {'insert': value}
+            elif kind == RETAIN:
+                value, pos = read_varint(buf, pos)
+                op = {'retain': value}
+            elif kind == DELETE:
+                value, pos = read_varint(buf, pos)
+                op = {'delete': value}
+            else:
+                raise DecodeError("unknown op tag: %r" % tag)
+            if tag & HAS_ATTRIBUTES:
+                op['attributes'], pos = self.read_map(buf, pos)
+            ops.append(op)
+        return ops, pos
+
+    def read_key(self, buf, pos):
+        index, pos = read_varint(buf, pos)
+        if index == 0:
+            key, pos = read_string(buf, pos)
+            self.keys.append(key)
+            return key, pos
+        try:
+            return self.keys[index - 1], pos
+        except IndexError:
+            raise DecodeError("unknown key index: %d" % index)
+
+    def read_map(self, buf, pos):
+        count, pos = read_varint(buf, pos)
+        value = {}
+        for _ in range(count):
+            key, pos = self.read_key(buf, pos)
+            value[key], pos = self.read_value(buf, pos)
+        return value, pos
+
+    def read_value(self, buf, pos):
+        try:
+            tag = buf[pos]
+        except IndexError:
+            raise DecodeError("truncated value")
+        pos += 1
+        if tag == NONE:
+            return None, pos
+        elif tag == TRUE:
+            return True, pos
+        elif tag == FALSE:
+            return False, pos
+        elif tag == INT:
+            value, pos = read_varint(buf, pos)
+            return (value >> 1) if not value & 1 else -((value + 1) >> 1), pos
+        elif tag == FLOAT:
+            if pos + DOUBLE.size > len(buf):
+                raise DecodeError("truncated float")
+            return DOUBLE.unpack_from(buf, pos)[0], pos + DOUBLE.size
+        elif tag == STRING:
+            return read_string(buf, pos)
+        elif tag == LIST:
+            count, pos = read_varint(buf, pos)
+            items = []
+            for _ in range(count):
+                item, pos = self.read_value(buf, pos)
+                items.append(item)
+            return items, pos
+        elif tag == MAP:
+            return self.read_map(buf, pos)
+        raise DecodeError("unknown value tag: %r" % tag)
+
+
+def encode(delta):
+    return Encoder().encode(delta)
+
+
+def decode(data):
+    return Decoder().decode(data)
@@ -0,0 +1,132 @@
+import weakref
+
+
+def freeze(value):
+    """
+    Return a hashable version of a JSON-like value.  Scalars keep their
+    type, so ``True``, ``1`` and ``1.0`` don't intern to the same embed.
+    """
+    if isinstance(value, dict):
+        return ('dict',) + tuple(sorted((k, freeze(v)) for k, v in value.items()))
+    if isinstance(value, (list, tuple)):
+        return ('list',) + tuple(freeze(v) for v in value)
+    return (type(value).__name__, value)
+
+
+def _immutable(self, *args, **kwargs):
+    raise TypeError("embeds are immutable, build a new payload instead")
+
+
+class FrozenDict(dict):
+    """
+    A ``dict`` that can't be changed, for the objects nested in an embed.
+    """
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (dict(self),))
+
+    __setitem__ = __delitem__ = clear = pop = popitem = setdefault = update = __ior__ = _immutable
+
+
+class FrozenList(list):
+    """
+    A ``list`` that can't be changed, for the lists nested in an embed.
+    """
+    __slots__ = ()
+
+    def __copy__(self):
+        return self
+
+    def __deepcopy__(self, memo):
+        return self
+
+    def __reduce__(self):
+        return (self.__class__, (list(self),))
+
+    __setitem__ = __delitem__ = __iadd__ = __imul__ = _immutable
+    append = extend = insert = pop = remove = clear = sort = reverse = _immutable
+
+
+def frozen_copy(value):
+    """
+    Return a deep copy of a JSON-like value made of ``FrozenDict`` and
+    ``FrozenList``, so nothing in it is shared with the caller.
+    """
+    if isinstance(value, dict):
+        if isinstance(value, FrozenDict):
+            return value
+        return FrozenDict((k, frozen_copy(v)) for k, v in value.items())
+    if isinstance(value, (list, tuple)):
+        if isinstance(value, FrozenList):
+            return value
+        return FrozenList(frozen_copy(v) for v in value)
+    return value
+
+
+class Embed(FrozenDict):
+    """
+    An interned, immutable embed payload such as ``{'image': url}``.
+
+    Copies are the object itself and equal embeds from the same table are
+    the same object, so copying, comparing and hashing are cheap.  It is
+    still a ``dict`` for reading and serializing.  The payload is copied,
+    so changing the dict it was made from doesn't change the embed.
+    """
+    __slots__ = ('_hash', '__weakref__')
+
+    def __init__(self, payload, key=None):
+        dict.__init__(self, ((k, frozen_copy(v)) for k, v in payload.items()))
+        self._hash = hash(freeze(payload) if key is None else key)
+
+    def __hash__(self):
+        return self._hash
+
+    def __eq__(self, other):
+        if self is other:
+            return True
+        return dict.__eq__(self, other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    def __reduce__(self):
+        return (intern, (dict(self),))
+
+
+class EmbedTable(object):
+    """
+    Interns embed payloads: equal payloads map to one ``Embed``.  Entries
+    are dropped once nothing uses them anymore.
+    """
+    def __init__(self):
+        self.embeds = weakref.WeakValueDictionary()
+
+    def __len__(self):
+        return len(self.embeds)
+
+    def intern(self, payload):
+        if isinstance(payload, Embed) or not isinstance(payload, dict):
+            return payload
+        key = freeze(payload)
+        embed = self.embeds.get(key)
+        if embed is None:
+            embed = self.embeds[key] = Embed(payload, key)
+        return embed
+
+
+table = EmbedTable()
+
+
+def intern(payload, embeds=None):
+    """
+    Return the interned ``Embed`` for a payload from ``embeds`` (the
+    process-wide table by default).  Anything but a dict is returned as is.
+    """
+    return (table if embeds is None else embeds).intern(payload)
@@ -0,0 +1,162 @@
+import threading
+import time
+import weakref
+
+from .base import Delta
+
+
+class History(object):
+    """
+    The revision log of a single document: a ``checkpoint`` delta holding
+    the composed document as of revision ``base``, followed by the
+    fine-grained ``changes`` applied since.
+
+    Compaction folds old changes into the checkpoint with ``compose``.  The
+    expensive compose runs outside of the lock, so ``apply()`` never waits on
+    a compaction in progress.  Compactions take ``compacting`` for their
+    whole length, so two of them never fold the same changes.
+    """
+    def __init__(self, document=None, revision=0):
+        self.checkpoint = Delta(document)
+        self.base = revision
+        self.changes = []
+        self.times = []
+        self.lock = threading.Lock()
+        self.compacting = threading.Lock()
+
+    def __len__(self):
+        return len(self.changes)
+
+    @property
+    def revision(self):
+        return self.base + len(self.changes)
+
+    def apply(self, change, timestamp=None):
+        """
+        Append ``change`` to the log and return the new revision number.
+        """
+        if timestamp is None:
+            timestamp = time.time()
+        with self.lock:
+            self.changes.append(Delta(change))
+            self.times.append(timestamp)
+            return self.base + len(self.changes)
+
+    def since(self, revision):
+        """
+        Return the changes applied after ``revision``.
+
+        Raises ``ValueError`` if that revision was already folded into the
+        checkpoint.
+        """
+        with self.lock:
+            if revision < self.base:
+                raise ValueError("revision %d was compacted (history starts at %d)" % (revision, self.base))
+            return self.changes[revision - self.base:]
+
+    def document(self):
+        with self.lock:
+            document = self.checkpoint
+            changes = list(self.changes)
+        for change in changes:
+            document = document.compose(change)
+        return document
+
+    def compactable(self, keep=0, max_age=None, now=None):
+        """
+        Return the number of changes that fall outside of the retention
+        window: everything but the last ``keep`` changes, and of those only
+        the ones older than ``max_age`` seconds if it is given.
+        """
+        with self.lock:
+            count = max(len(self.changes) - keep, 0)
+            if max_age is not None:
+                cutoff = (time.time() if now is None else now) - max_age
+                older = 0
+                while older < count and self.times[older] <= cutoff:
+                    older += 1
+                count = older
+        return count
+
+    def compact(self, keep=0, max_age=None, now=None):
+        """
+        Fold the changes outside of the retention window into the checkpoint
+        and return how many were folded.
+        """
+        with self.compacting:
+            count = self.compactable(keep, max_age, now)
+            if count <= 0:
+                return 0
+
+            with self.lock:
+                checkpoint = self.checkpoint
+                changes = self.changes[:count]
+
+            for change in changes:
+                checkpoint = checkpoint.compose(change)
+
+            # apply() only ever appends and no other compaction can run, so
+            # the first ``count`` entries are still the ones just composed.
+            with self.lock:
+                self.checkpoint = checkpoint
+                self.base += count
+                del self.changes[:count]
+                del self.times[:count]
+            return count
+
+
+class Compactor(threading.Thread):
+    """
+    A daemon thread that periodically compacts every registered ``History``.
+
+    Progress is exposed through ``runs``, ``compacted`` (changes folded so
+    far), ``pending`` (changes outside the retention window as of the last
+    pass) and ``last_duration`` (seconds spent in the last pass).
+    """
+    def __init__(self, interval=60, keep=100, max_age=None):
+        super(Compactor, self).__init__(name='delta-compactor')
+        self.daemon = True
+        self.interval = interval
+        self.keep = keep
+        self.max_age = max_age
+        self.histories = weakref.WeakSet()
+        self.runs = 0
+        self.compacted = 0
+        self.pending = 0
+        self.last_duration = 0.0
+        self._stopped = threading.Event()
+
+    def register(self, history):
+        self.histories.add(history)
+        return history
+
+    def unregister(self, history):
+        self.histories.discard(history)
+
+    def metrics(self):
+        return {
+            'histories': len(self.histories),
+            'runs': self.runs,
+            'compacted': self.compacted,
+            'pending': self.pending,
+            'last_duration': self.last_duration,
+        }
+
+    def run_once(self):
+        start = time.time()
+        pending = 0
+        for history in list(self.histories):
+            self.compacted += history.compact(self.keep, self.max_age, start)
+            pending += history.compactable(self.keep, self.max_age)
+        self.pending = pending
+        self.runs += 1
+        self.last_duration = time.time() - start
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.run_once()
+
+    def stop(self, timeout=None):
+        self._stopped.set()
+        if self.is_alive():
+            self.join(timeout)
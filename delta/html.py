@@ -1,6 +1,7 @@
 import logging
 from functools import wraps
 from .base import Delta
+from . import metrics
 from lxml.html import HtmlElement, Element
 from lxml import html
 from cssutils import parseStyle
@@ -74,7 +75,11 @@ class Format:
     def __call__(self, root, op):
         if self._check(op):
             try:
-                el = self.fn(root, op)
+                if metrics.enabled:
+                    with metrics.timed('render.format.%s.seconds' % self.name):
+                        el = self.fn(root, op)
+                else:
+                    el = self.fn(root, op)
             except Exception as e:
                 logger.error("Rendering format failed: %r", e)
                 el = ""
@@ -118,7 +123,11 @@ class BlockFormat(Format):
 
     def __call__(self, root, attrs):
         if self.name in attrs:
-            root = self.fn(root, attrs)
+            if metrics.enabled:
+                with metrics.timed('render.format.%s.seconds' % self.name):
+                    root = self.fn(root, attrs)
+            else:
+                root = self.fn(root, attrs)
         return root
 
     def __repr__(self):
@@ -319,14 +328,29 @@ def append_line(root, delta, attrs, index):
 
 
 def render(delta, method='html', pretty=False):
+    if metrics.enabled:
+        metrics.incr('render.calls')
+        with metrics.timed('render.seconds'):
+            return _render(delta, method, pretty)
+    return _render(delta, method, pretty)
+
+
+def new_root():
+    return html.fragment_fromstring("<template></template>")
+
+
+def tostring(root, method='html', pretty=False):
+    return "".join(
+        html.tostring(child, method=method, with_tail=True, encoding='unicode', pretty_print=pretty) 
+        for child in root)
+
+
+def _render(delta, method='html', pretty=False):
     if not isinstance(delta, Delta):
         delta = Delta(delta)
 
-    root = html.fragment_fromstring("<template></template>")
+    root = new_root()
     for line, attrs, index in delta.iter_lines():
         append_line(root, line, attrs, index)
 
-    result = "".join(
-        html.tostring(child, method=method, with_tail=True, encoding='unicode', pretty_print=pretty) 
-        for child in root)
-    return result
+    return tostring(root, method, pretty)
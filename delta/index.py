@@ -0,0 +1,553 @@
+import bisect
+import collections
+import re
+
+from . import op
+
+
+NULL_CHARACTER = chr(0)
+
+Match = collections.namedtuple('Match', 'start end text attributes')
+Formats = collections.namedtuple('Formats', 'common partial line')
+
+
+def common_attributes(ops):
+    """
+    Return the attributes that all of ``ops`` share with the same value.
+    """
+    common = None
+    for operator in ops:
+        attributes = operator.get('attributes') or {}
+        if common is None:
+            common = dict(attributes)
+        else:
+            for k in list(common):
+                if k not in attributes or attributes[k] != common[k]:
+                    del common[k]
+        if not common:
+            return {}
+    return common or {}
+
+
+def last_op(ops):
+    """
+    Return the last op of ``ops`` with its insert and attributes, which
+    ``push()`` replaces when it merges into it.
+    """
+    if not ops:
+        return None, None, None
+    last = ops[-1]
+    return last, last.get('insert'), last.get('attributes')
+
+
+class OffsetIndex(object):
+    """
+    Position index over a document (a delta with only inserts): the start
+    offset of every op and the plain text, with embeds as ``NULL_CHARACTER``
+    like ``Delta.document()``.  Finding the op at an offset is a binary search.
+    """
+    def __init__(self, ops):
+        self.ops = ops
+        self.size = len(ops)
+        self.starts = []
+        parts = []
+        offset = 0
+        for operator in ops:
+            insert = operator.get('insert')
+            if not insert:
+                raise ValueError("OffsetIndex can only be built for Deltas that have only insert ops")
+            self.starts.append(offset)
+            if isinstance(insert, str):
+                parts.append(insert)
+                offset += len(insert)
+            else:
+                parts.append(NULL_CHARACTER)
+                offset += 1
+        self.text = "".join(parts)
+        self.length = offset
+        self._newlines = None
+        self.tail = last_op(ops)
+
+    def __len__(self):
+        return self.length
+
+    def valid_for(self, ops):
+        """
+        Whether the index still describes ``ops``.  Appending to the list or
+        merging into its last op, as ``push()`` does, is noticed even by
+        another delta sharing the list; editing earlier ops in place isn't.
+        """
+        if self.ops is not ops or self.size != len(ops):
+            return False
+        return all(a is b for a, b in zip(self.tail, last_op(ops)))
+
+    def find(self, offset):
+        """
+        Return the index of the op containing ``offset``, or ``None``.
+        """
+        if offset < 0 or offset >= self.length:
+            return None
+        return bisect.bisect_right(self.starts, offset) - 1
+
+    def span(self, start, end):
+        """
+        Return the range of op indexes overlapping ``[start, end)``.
+        """
+        if end <= start:
+            return range(0)
+        first = self.find(max(start, 0))
+        if first is None:
+            return range(0)
+        last = bisect.bisect_left(self.starts, min(end, self.length))
+        return range(first, last)
+
+    def attributes_at(self, offset):
+        index = self.find(offset)
+        if index is None:
+            return {}
+        return self.ops[index].get('attributes') or {}
+
+    def attributes_between(self, start, end):
+        """
+        Return the attributes shared by everything in ``[start, end)``.
+        """
+        return common_attributes(self.ops[i] for i in self.span(start, end))
+
+    @property
+    def newlines(self):
+        """
+        Sorted offsets of the newlines, built on first use.
+        """
+        if self._newlines is None:
+            self._newlines = [m.start() for m in re.finditer('\n', self.text)]
+        return self._newlines
+
+    def line_formats(self, start, end):
+        """
+        Return the line formats shared by every line overlapping
+        ``[start, end)``, or the line at ``start`` if the range is empty.
+        """
+        first = bisect.bisect_left(self.newlines, start)
+        last = bisect.bisect_left(self.newlines, max(end - 1, start)) + 1
+        return common_attributes(self.ops[self.find(n)] for n in self.newlines[first:last])
+
+    def formats(self, index, length=0):
+        """
+        Return the ``Formats`` of ``[index, index + length)``: the inline
+        formats all of it has (``common``), the ones only some of it has with
+        their distinct values (``partial``) and the line formats (``line``).
+        An empty range reports the formats a character typed there would
+        get, i.e. those of the character before it, or at the start of a
+        line those of the character after it.  Newlines carry line
+        formats, so they never provide inline ones.
+        """
+        if length <= 0:
+            common = {}
+            for offset in (index - 1, index):
+                if 0 <= offset < self.length and self.text[offset] == '\n':
+                    continue
+                found = self.find(offset)
+                if found is not None:
+                    common = dict(self.ops[found].get('attributes') or {})
+                    break
+            return Formats(common, {}, self.line_formats(index, index))
+
+        ops = [self.ops[i] for i in self.span(index, index + length)]
+        # Lines are formatted through their newline, not inline
+        inline = [o for o in ops if not (isinstance(o['insert'], str) and o['insert'].strip('\n') == '')] or ops
+        common = common_attributes(inline)
+        partial = {}
+        for operator in inline:
+            for name, value in (operator.get('attributes') or {}).items():
+                if name not in common:
+                    values = partial.setdefault(name, [])
+                    if value not in values:
+                        values.append(value)
+        return Formats(common, partial, self.line_formats(index, index + length))
+
+    def search(self, pattern, regex=False, flags=0):
+        """
+        Yield a ``Match`` for every occurrence of ``pattern`` in the text.
+        """
+        if regex or flags:
+            for m in re.finditer(pattern, self.text, flags):
+                if m.end() > m.start():
+                    yield self.match(m.start(), m.end())
+            return
+        if not pattern:
+            return
+        start = self.text.find(pattern)
+        while start >= 0:
+            yield self.match(start, start + len(pattern))
+            start = self.text.find(pattern, start + len(pattern))
+
+    def match(self, start, end):
+        return Match(start, end, self.text[start:end], self.attributes_between(start, end))
+
+
+def collect(ops, offset=0):
+    """
+    Return ``{name: [(start, end, value), ...]}`` for the attributes of
+    ``ops``, with adjacent runs of the same value merged.
+    """
+    ranges = {}
+    for operator in ops:
+        length = op.length(operator)
+        for name, value in (operator.get('attributes') or {}).items():
+            runs = ranges.setdefault(name, [])
+            if runs and runs[-1][1] == offset and runs[-1][2] == value:
+                runs[-1] = (runs[-1][0], offset + length, value)
+            else:
+                runs.append((offset, offset + length, value))
+        offset += length
+    return ranges
+
+
+def region(change):
+    """
+    Return ``(start, end, shift, ops)``: the range of the old document that
+    ``change`` modifies, how much everything after it moves and the ops of
+    ``change`` covering that range, or ``None`` when it only retains.
+    """
+    start = None
+    end = position = shift = 0
+    first = last = 0
+    for i, operator in enumerate(change.ops):
+        typ = op.type(operator)
+        length = op.length(operator)
+        if typ == 'retain' and not operator.get('attributes'):
+            position += length
+            continue
+        if start is None:
+            start = position
+            first = i
+        if typ == 'insert':
+            shift += length
+        else:
+            if typ == 'delete':
+                shift -= length
+            position += length
+        end = position
+        last = i + 1
+    if start is None:
+        return None
+    return start, end, shift, change.ops[first:last]
+
+
+def touched(change):
+    """
+    Return ``(start, end, shift)``: the range of the old document that
+    ``change`` modifies and how much everything after it moves, or ``None``
+    when it only retains.
+    """
+    found = region(change)
+    return found[:3] if found is not None else None
+
+
+def compose_segments(segments, ops):
+    """
+    Apply ``ops`` to ``segments``, ``(length, attributes, tag)`` pieces of
+    the old document, and return ``(length, attributes, tag, insert)``
+    pieces of the new one.  Retained pieces keep their tag and get their
+    attributes composed like ``Delta.compose()`` does; inserted ones have
+    a ``None`` tag and their insert.
+    """
+    result = []
+    i = offset = 0
+    for operator in ops:
+        if 'insert' in operator:
+            result.append((op.length(operator), operator.get('attributes') or {}, None, operator['insert']))
+            continue
+        length = op.length(operator)
+        attributes = operator.get('attributes')
+        while length > 0 and i < len(segments):
+            size, current, tag = segments[i]
+            n = min(length, size - offset)
+            if 'retain' in operator:
+                if attributes:
+                    current = op.compose(current, attributes) or {}
+                result.append((n, current, tag, None))
+            offset += n
+            length -= n
+            if offset == size:
+                i += 1
+                offset = 0
+    return result
+
+
+class DocumentIndex(object):
+    """
+    Base for indexes kept up to date by ``apply(change)``.  Changes are
+    composed into ``document`` only when it is read, so applying one costs
+    what updating the index costs.
+    """
+    def __init__(self, document):
+        self._document = document
+        self.pending = []
+
+    @property
+    def document(self):
+        if self.pending:
+            change = self.pending[0]
+            for other in self.pending[1:]:
+                change = change.compose(other)
+            self._document = self._document.compose(change)
+            self.pending = []
+        return self._document
+
+    def record(self, change):
+        self.pending.append(change)
+
+
+class AttributeIndex(DocumentIndex):
+    """
+    Interval index of the formatted ranges of a document, by attribute name.
+
+    ``ranges('link')`` lists every ``(start, end, value)`` run of an
+    attribute and ``formats_at(offset)`` does a binary search per attribute
+    name.  ``apply(change)`` recomputes the runs in the range the change
+    touches from the runs already there, without reading the document.
+    Attributes with no run in that range are left alone unless the change
+    inserts or deletes text, in which case the runs after it are shifted in
+    place, which is linear in the number of runs that follow.
+    """
+    def __init__(self, document):
+        super(AttributeIndex, self).__init__(document)
+        self.runs = collect(document.ops)
+        self.starts = {}
+        self.ends = {}
+        for name in self.runs:
+            self._reindex(name)
+
+    def _reindex(self, name):
+        runs = self.runs[name]
+        if not runs:
+            del self.runs[name]
+            self.starts.pop(name, None)
+            self.ends.pop(name, None)
+            return
+        self.starts[name] = [r[0] for r in runs]
+        self.ends[name] = [r[1] for r in runs]
+
+    def names(self):
+        return sorted(self.runs)
+
+    def ranges(self, name, *value):
+        """
+        Return the ``(start, end, value)`` runs of attribute ``name``, only
+        those with the given value if one is passed.
+        """
+        runs = self.runs.get(name, [])
+        if value:
+            return [r for r in runs if r[2] == value[0]]
+        return list(runs)
+
+    def formats_at(self, offset):
+        formats = {}
+        for name, starts in self.starts.items():
+            i = bisect.bisect_right(starts, offset) - 1
+            if i >= 0 and self.ends[name][i] > offset:
+                formats[name] = self.runs[name][i][2]
+        return formats
+
+    def segments(self, start, end):
+        """
+        Return ``[start, end)`` as ``(length, attributes, None)`` pieces.
+        """
+        cuts = set([start, end])
+        covering = []
+        for name, runs in self.runs.items():
+            first = bisect.bisect_right(self.ends[name], start)
+            last = bisect.bisect_left(self.starts[name], end)
+            for s, e, value in runs[first:last]:
+                s, e = max(s, start), min(e, end)
+                covering.append((s, e, name, value))
+                cuts.add(s)
+                cuts.add(e)
+        cuts = sorted(cuts)
+        attributes = [{} for _ in cuts[1:]]
+        for s, e, name, value in covering:
+            for k in range(bisect.bisect_left(cuts, s), bisect.bisect_left(cuts, e)):
+                attributes[k][name] = value
+        return [(b - a, attrs, None) for a, b, attrs in zip(cuts, cuts[1:], attributes)]
+
+    def apply(self, change):
+        """
+        Update the index for ``change`` and record it for ``document``.
+        """
+        found = region(change)
+        self.record(change)
+        if found is None:
+            return self
+        start, end, shift, ops = found
+        pieces = compose_segments(self.segments(start, end), ops)
+        fresh = collect([{'retain': length, 'attributes': attrs} for length, attrs, _, _ in pieces], start)
+
+        for name in set(self.runs) | set(fresh):
+            runs = self.runs.setdefault(name, [])
+            starts = self.starts.setdefault(name, [])
+            ends = self.ends.setdefault(name, [])
+            first = bisect.bisect_right(ends, start)
+            last = bisect.bisect_left(starts, end)
+            if first == last and not shift and name not in fresh:
+                continue
+            heads, tails = [], []
+            for s, e, v in runs[first:last]:
+                if s < start:
+                    heads.append((s, start, v))
+                if e > end:
+                    tails.append((end + shift, e + shift, v))
+            if shift:
+                for i in range(last, len(runs)):
+                    s, e, v = runs[i]
+                    runs[i] = (s + shift, e + shift, v)
+                    starts[i] = s + shift
+                    ends[i] = e + shift
+            # only the runs next to the touched range can merge with it
+            lo = max(first - 1, 0)
+            window = runs[lo:first] + heads + fresh.get(name, []) + tails + runs[last:last + 1]
+            merged = merge_runs(window, 0, len(window))
+            runs[lo:last + 1] = merged
+            starts[lo:last + 1] = [r[0] for r in merged]
+            ends[lo:last + 1] = [r[1] for r in merged]
+            if not runs:
+                self._reindex(name)
+        return self
+
+
+def merge_runs(runs, lo, hi):
+    """
+    Merge touching runs of the same value between positions ``lo`` and
+    ``hi`` of ``runs`` and drop empty ones.
+    """
+    merged = runs[:lo]
+    for run in runs[lo:hi]:
+        if run[0] >= run[1]:
+            continue
+        if merged and merged[-1][1] == run[0] and merged[-1][2] == run[2]:
+            merged[-1] = (merged[-1][0], run[1], run[2])
+        else:
+            merged.append(run)
+    # the first untouched run may now touch the last merged one
+    rest = runs[hi:]
+    if rest and merged and merged[-1][1] == rest[0][0] and merged[-1][2] == rest[0][2]:
+        merged[-1] = (merged[-1][0], rest[0][1], rest[0][2])
+        rest = rest[1:]
+    return merged + rest
+
+
+def newlines(ops, offset=0, newline='\n'):
+    """
+    Return the offsets of the newlines in ``ops`` and their attributes.
+    """
+    ends = []
+    formats = []
+    for operator in ops:
+        insert = operator.get('insert')
+        if isinstance(insert, str):
+            i = insert.find(newline)
+            while i >= 0:
+                ends.append(offset + i)
+                formats.append(operator.get('attributes') or {})
+                i = insert.find(newline, i + 1)
+            offset += len(insert)
+        else:
+            offset += op.length(operator)
+    return ends, formats
+
+
+class LineIndex(DocumentIndex):
+    """
+    Maps between line numbers and offsets of a document, with the block
+    attributes of every line, numbering lines like ``Delta.iter_lines()``.
+
+    ``apply(change)`` replaces the lines inside the range the change touches,
+    working from the change and the newlines already indexed, without
+    reading the document.  When the change inserts or deletes text the
+    offsets of the lines after it are shifted, which is linear in their
+    number but a single list operation.
+    """
+    def __init__(self, document, newline='\n'):
+        super(LineIndex, self).__init__(document)
+        self.newline = newline
+        self.ends, self.formats = newlines(document.ops, 0, newline)
+        self.length = len(document)
+
+    def __len__(self):
+        end = self.ends[-1] + 1 if self.ends else 0
+        return len(self.ends) + (1 if self.length > end else 0)
+
+    def line_of(self, offset):
+        """
+        Return the number of the line containing ``offset``.
+        """
+        if offset < 0 or offset >= self.length:
+            raise IndexError("offset out of range: %r" % offset)
+        return bisect.bisect_left(self.ends, offset)
+
+    def offset_of(self, line):
+        """
+        Return the offset where ``line`` starts.
+        """
+        if line < 0 or line >= len(self):
+            raise IndexError("line out of range: %r" % line)
+        return self.ends[line - 1] + 1 if line else 0
+
+    def line_range(self, line):
+        """
+        Return ``(start, end)`` of ``line``, ``end`` being the offset of its
+        newline (or the end of the document for a last unterminated line).
+        """
+        start = self.offset_of(line)
+        end = self.ends[line] if line < len(self.ends) else self.length
+        return start, end
+
+    def attributes(self, line):
+        if line < 0 or line >= len(self):
+            raise IndexError("line out of range: %r" % line)
+        return self.formats[line] if line < len(self.formats) else {}
+
+    def apply(self, change):
+        """
+        Update the index for ``change`` and record it for ``document``.
+        """
+        found = region(change)
+        self.record(change)
+        if found is None:
+            return self
+        start, end, shift, ops = found
+        self.length += shift
+
+        first = bisect.bisect_left(self.ends, start)
+        last = bisect.bisect_left(self.ends, end)
+        # the old range as text and newline pieces
+        segments = []
+        position = start
+        for k in range(first, last):
+            if self.ends[k] > position:
+                segments.append((self.ends[k] - position, {}, False))
+            segments.append((1, self.formats[k], True))
+            position = self.ends[k] + 1
+        if end > position:
+            segments.append((end - position, {}, False))
+
+        ends, formats = [], []
+        position = start
+        for length, attributes, is_newline, insert in compose_segments(segments, ops):
+            if isinstance(insert, str):
+                i = insert.find(self.newline)
+                while i >= 0:
+                    ends.append(position + i)
+                    formats.append(attributes)
+                    i = insert.find(self.newline, i + 1)
+            elif is_newline:
+                ends.append(position)
+                formats.append(attributes)
+            position += length
+
+        if shift:
+            self.ends[first:] = ends + [e + shift for e in self.ends[last:]]
+        else:
+            self.ends[first:last] = ends
+        self.formats[first:last] = formats
+        return self
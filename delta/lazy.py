@@ -0,0 +1,132 @@
+import json
+import re
+
+from .base import Delta
+
+
+OPS_START = re.compile(r'\s*(?:\{\s*"ops"\s*:\s*)?\[')
+WHITESPACE = re.compile(r'\s*')
+# shared, so LazyOps holds nothing that can't be copied or pickled
+decoder = json.JSONDecoder()
+
+
+class LazyOps(object):
+    """
+    A read-only list of ops decoded from serialized JSON only as far as it
+    is indexed or iterated.  Accepts a JSON array of ops or an object whose
+    first key is ``"ops"``, as bytes or text.
+    """
+    def __init__(self, raw):
+        if isinstance(raw, (bytes, bytearray, memoryview)):
+            raw = bytes(raw).decode('utf-8')
+        match = OPS_START.match(raw)
+        if match is None:
+            raise ValueError("expected a JSON list of ops or an object starting with \"ops\"")
+        self.raw = raw
+        self.pos = match.end()
+        self.items = []
+        self.done = False
+
+    def _decode_next(self):
+        raw = self.raw
+        pos = WHITESPACE.match(raw, self.pos).end()
+        if raw.startswith(']', pos):
+            self.done = True
+            self.raw = None
+            return False
+        item, pos = decoder.raw_decode(raw, pos)
+        pos = WHITESPACE.match(raw, pos).end()
+        if raw.startswith(',', pos):
+            pos += 1
+        elif not raw.startswith(']', pos):
+            raise ValueError("malformed ops list at position %d" % pos)
+        self.pos = pos
+        self.items.append(item)
+        return True
+
+    def _decode_until(self, index):
+        while not self.done and len(self.items) <= index:
+            self._decode_next()
+
+    def materialize(self):
+        while not self.done:
+            self._decode_next()
+        return self.items
+
+    @property
+    def decoded(self):
+        return len(self.items)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice) or index < 0:
+            return self.materialize()[index]
+        self._decode_until(index)
+        return self.items[index]
+
+    def __iter__(self):
+        i = 0
+        while True:
+            self._decode_until(i)
+            if i >= len(self.items):
+                return
+            yield self.items[i]
+            i += 1
+
+    def __len__(self):
+        return len(self.materialize())
+
+    def __bool__(self):
+        self._decode_until(0)
+        return bool(self.items)
+
+    def __eq__(self, other):
+        return self.materialize() == list(other)
+
+    def __repr__(self):
+        if self.done:
+            return repr(self.items)
+        return "%s... (%d decoded)" % (repr(self.items)[:-1], len(self.items))
+
+
+class LazyDelta(Delta):
+    """
+    A delta over raw serialized ops that only decodes what is used.
+
+    Reading the first ops, slicing near the start and ``iter_lines()`` only
+    decode as far as they get; ``len()`` and comparisons decode everything.
+    Changing the delta (``push()``, ``insert()``, ``chop()``...) first turns
+    its ops into a plain list, after which it behaves like any ``Delta``.
+    Anything but raw JSON is taken as ops, like ``Delta()`` does.
+    """
+    def __init__(self, raw=None, **attrs):
+        if isinstance(raw, (str, bytes, bytearray, memoryview)):
+            raw = LazyOps(raw)
+        super(LazyDelta, self).__init__(raw, **attrs)
+
+    @property
+    def lazy(self):
+        return isinstance(self.ops, LazyOps)
+
+    def materialize(self):
+        if self.lazy:
+            self.ops = self.ops.materialize()
+        return self
+
+    def __eq__(self, other):
+        return list(self.ops) == list(other.ops)
+
+    def push(self, operation):
+        self.materialize()
+        return super(LazyDelta, self).push(operation)
+
+    def extend(self, ops):
+        self.materialize()
+        return super(LazyDelta, self).extend(ops)
+
+    def chop(self):
+        self.materialize()
+        return super(LazyDelta, self).chop()
+
+    def concat(self, other):
+        self.materialize()
+        return super(LazyDelta, self).concat(other)
@@ -0,0 +1,162 @@
+"""
+Approximate memory accounting for deltas.
+
+``sizeof(delta)`` reports the bytes a delta keeps alive by part: the op
+list and op dicts, insert strings, attribute dicts with their values,
+embeds that belong to it alone, its cached ``offset_index()`` and, apart
+from the rest, the interned embeds it shares with other documents.
+Objects referenced twice are counted once.  Sizes come from
+``sys.getsizeof``, so allocator overhead is not included; ``None``,
+booleans and attribute names are shared by everything and not counted.
+
+``track(document)`` adds a document (or anything with a ``document``
+attribute holding one, such as a ``Session``) to a process wide registry
+without keeping it alive, and ``summary()`` adds up everything tracked.
+"""
+import collections
+import sys
+import weakref
+
+from .base import Delta
+from .embed import Embed
+from .lazy import LazyOps
+
+
+class Usage(collections.namedtuple('Usage', 'ops strings attributes embeds index shared')):
+    """
+    Bytes used by each part of a delta.  ``total`` is what dropping the
+    delta would free, i.e. everything but ``shared``.
+    """
+    __slots__ = ()
+
+    @property
+    def total(self):
+        return self.ops + self.strings + self.attributes + self.embeds + self.index
+
+
+def deep_size(value, seen):
+    """
+    Return the size of ``value`` and everything it contains that isn't in
+    ``seen`` yet, adding them to it.
+    """
+    if value is None or isinstance(value, bool) or id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, dict):
+        for k, v in value.items():
+            size += deep_size(k, seen) + deep_size(v, seen)
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            size += deep_size(v, seen)
+    return size
+
+
+def sizeof(delta, seen=None, shared=None):
+    """
+    Return the ``Usage`` of ``delta``.  Objects already in ``seen`` (or for
+    interned embeds, in ``shared``) are skipped, which is how several
+    deltas are measured without counting what they share twice.
+    """
+    seen = set() if seen is None else seen
+    shared = set() if shared is None else shared
+    ops_size = strings = attributes_size = embeds = shared_size = 0
+
+    ops = delta.ops
+    if isinstance(ops, LazyOps):
+        # the undecoded source is held until everything is decoded
+        ops_size += sys.getsizeof(ops) + sys.getsizeof(ops.items)
+        if ops.raw is not None:
+            strings += deep_size(ops.raw, seen)
+        ops = ops.items
+    elif id(ops) not in seen:
+        seen.add(id(ops))
+        ops_size += sys.getsizeof(ops)
+
+    for operator in ops:
+        if id(operator) in seen:
+            continue
+        seen.add(id(operator))
+        ops_size += sys.getsizeof(operator)
+        insert = operator.get('insert')
+        if isinstance(insert, str):
+            strings += deep_size(insert, seen)
+        elif isinstance(insert, Embed):
+            shared_size += deep_size(insert, shared)
+        elif insert is not None:
+            embeds += deep_size(insert, seen)
+        attributes = operator.get('attributes')
+        if attributes is not None and id(attributes) not in seen:
+            seen.add(id(attributes))
+            attributes_size += sys.getsizeof(attributes)
+            for value in attributes.values():
+                attributes_size += deep_size(value, seen)
+
+    index_size = 0
+    index = getattr(delta, '_index', None)
+    if index is not None and id(index) not in seen:
+        seen.add(id(index))
+        index_size = sys.getsizeof(index) + deep_size(index.text, seen) + deep_size(index.starts, seen)
+        index_size += deep_size(index._newlines, seen)
+
+    return Usage(ops_size, strings, attributes_size, embeds, index_size, shared_size)
+
+
+### Registry ###
+tracked = {}
+
+
+def track(obj, name=None):
+    """
+    Register a document, or an object with a ``document`` attribute, under
+    ``name`` until it is garbage collected or untracked.  Returns ``obj``.
+    """
+    key = id(obj)
+    ref = weakref.ref(obj, lambda ref: tracked.pop(key, None))
+    tracked[key] = (name if name is not None else key, ref)
+    return obj
+
+
+def untrack(obj):
+    tracked.pop(id(obj), None)
+
+
+def documents():
+    """
+    Return ``[(name, delta), ...]`` for everything tracked that is alive.
+    """
+    found = []
+    for name, ref in list(tracked.values()):
+        obj = ref()
+        if obj is None:
+            continue
+        delta = obj if isinstance(obj, Delta) else getattr(obj, 'document', None)
+        if isinstance(delta, Delta):
+            found.append((name, delta))
+    return found
+
+
+def summary(largest=10):
+    """
+    Measure every tracked document.  Returns a dict with the number of
+    ``documents``, the summed ``usage``, the ``total`` bytes including
+    shared embeds and the ``largest`` documents as ``(name, bytes)``.
+    Anything tracked documents share is counted once, for the first one.
+    """
+    seen = set()
+    shared = set()
+    parts = [0] * len(Usage._fields)
+    sizes = []
+    found = documents()
+    for name, delta in found:
+        usage = sizeof(delta, seen, shared)
+        parts = [a + b for a, b in zip(parts, usage)]
+        sizes.append((name, usage.total))
+    usage = Usage(*parts)
+    sizes.sort(key=lambda item: item[1], reverse=True)
+    return {
+        'documents': len(found),
+        'usage': usage,
+        'total': usage.total + usage.shared,
+        'largest': sizes[:largest],
+    }
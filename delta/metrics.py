@@ -0,0 +1,70 @@
+"""
+Opt-in counters for the hot paths of the library.
+
+Nothing is recorded until ``enable()`` is called; while disabled the only
+cost at each instrumented spot is reading the module level ``enabled`` flag.
+
+Counters:
+
+* ``compose.calls``, ``compose.ops`` - compose calls and input ops
+* ``transform.calls``, ``transform.ops`` - same for transform
+* ``diff.calls``, ``diff.ops``, ``diff.timeouts`` - diffs that hit the
+  diff_match_patch deadline and fell back to a coarser diff
+* ``iterator.splits`` - ops split in two by ``op.Iterator.next``
+* ``push.merges`` - ops merged into the previous one by ``Delta.push``
+* ``render.calls``, ``render.seconds`` and ``render.format.<name>.seconds``
+* ``validate.errors`` - deltas rejected by ``delta.validate``
+
+Listeners registered with ``subscribe(fn)`` are called as ``fn(name, value)``
+for every update, which is how values get exported to a metrics system.
+"""
+import collections
+import contextlib
+import time
+
+
+enabled = False
+values = collections.defaultdict(float)
+listeners = []
+
+
+def enable():
+    global enabled
+    enabled = True
+
+
+def disable():
+    global enabled
+    enabled = False
+
+
+def reset():
+    values.clear()
+
+
+def subscribe(fn):
+    listeners.append(fn)
+    return fn
+
+
+def unsubscribe(fn):
+    listeners.remove(fn)
+
+
+def incr(name, value=1):
+    values[name] += value
+    for fn in listeners:
+        fn(name, value)
+
+
+@contextlib.contextmanager
+def timed(name):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        incr(name, time.perf_counter() - start)
+
+
+def snapshot():
+    return dict(values)
@@ -1,5 +1,7 @@
 import copy
 
+from . import metrics
+
 
 def compose(a, b, keep_null=False):
     """
@@ -65,6 +67,26 @@ def transform(a, b, priority=True):
     return attributes or None
 
 
+def invert(a, base):
+    """
+    Return the attributes that undo applying ``a`` on top of ``base``.
+    """
+    if a is None:
+        a = {}
+    if base is None:
+        base = {}
+
+    attributes = {}
+    for k, v in base.items():
+        if k in a and a[k] != v:
+            attributes[k] = v
+    for k, v in a.items():
+        if k not in base:
+            attributes[k] = None
+
+    return attributes or None
+
+
 def length_of(op):
     typ = type_of(op)
     if typ == 'delete':
@@ -88,10 +110,51 @@ def type_of(op):
 
 
 
+def slice_insert(insert, offset, length):
+    if isinstance(insert, str):
+        return insert[offset:offset+length]
+    assert offset == 0
+    assert length == 1
+    return insert
+
+
+def clone(op):
+    """
+    Copy an op and its attributes dict, sharing the insert and the
+    attribute values.
+    """
+    new_op = dict(op)
+    if new_op.get('attributes') is not None:
+        new_op['attributes'] = dict(new_op['attributes'])
+    return new_op
+
+
+def make(typ, length, attributes, insert, offset=0):
+    """
+    Build an op dict from the parts returned by ``Iterator.take()``.
+    """
+    if typ == 'delete':
+        return {'delete': length}
+
+    result_op = {}
+    if attributes:
+        result_op['attributes'] = attributes
+
+    if typ == 'retain':
+        result_op['retain'] = length
+    else:
+        result_op['insert'] = slice_insert(insert, offset, length)
+
+    return result_op
+
+
 class Iterator(object):
     """
     An iterator that enables itself to break off operations
     to exactly the length needed via the ``next()`` method.
+
+    ``take()`` is the low level version of ``next()`` that doesn't build a
+    new op; the type and length of the current op are only computed once.
     """
     def __init__(self, ops=[]):
         self.ops = ops
@@ -100,47 +163,73 @@ class Iterator(object):
     def reset(self):
         self.index = 0
         self.offset = 0
+        self._load()
 
-    def has_next(self):
-        return self.peek_length() is not None
+    def _load(self):
+        try:
+            self._op = self.ops[self.index]
+        except IndexError:
+            self._op = None
+            self._type = 'retain'
+            self._length = None
+        else:
+            self._type = type_of(self._op)
+            self._length = length_of(self._op)
 
-    def next(self, length=None):
+    def has_next(self):
+        return self._op is not None
+
+    def take(self, length=None):
+        """
+        Consume up to ``length`` of the current op and return the tuple
+        ``(type, length, attributes, insert, offset)``.
+
+        ``insert`` is the *whole* insert of the current op and ``offset`` where
+        the consumed part starts in it, so no substring is made until
+        ``make()`` is called.  At the end the tuple is
+        ``('retain', None, None, None, 0)``.
+        """
+        current = self._op
+        if current is None:
+            return 'retain', None, None, None, 0
+
+        typ = self._type
         offset = self.offset
-
-        op = self.peek()
-        op_type = type_of(op)
-        if op is None:
-            return { 'retain': None }
-        
-        op_length = length_of(op)
-        if (length is None or length >= op_length - offset):
-            length = op_length - offset
+        remaining = self._length - offset
+        if length is None or length >= remaining:
+            length = remaining
             self.index += 1
             self.offset = 0
+            self._load()
         else:
             self.offset += length
+            if metrics.enabled:
+                metrics.incr('iterator.splits')
 
-        if op_type == 'delete':
-            return { 'delete': length }
-
-        result_op = {}
-        if op.get('attributes'):
-            result_op['attributes'] = op['attributes']
+        if typ == 'delete':
+            return typ, length, None, None, 0
+        return typ, length, current.get('attributes'), current.get('insert'), offset
 
-        if op_type == 'retain':
-            result_op['retain'] = length
-        elif isinstance(op.get('insert'), str):
-            result_op['insert'] = op['insert'][offset:offset+length]
-        else:
-            assert offset == 0
-            assert length == 1
-            if 'insert' in op:
-                result_op['insert'] = op['insert']
-
-        return result_op
+    def next(self, length=None):
+        typ, length, attributes, insert, offset = self.take(length)
+        if length is None:
+            return { 'retain': None }
+        return make(typ, length, attributes, insert, offset)
 
     __next__ = next
 
+    def rest(self):
+        """
+        Consume and return copies of the remaining ops, see ``clone()``.
+        """
+        if not self.has_next():
+            return []
+        ops = [clone(self.next())]
+        ops.extend(clone(o) for o in self.ops[self.index:])
+        self.index = len(self.ops)
+        self._load()
+        return ops
+
     def __length__(self):
         return len(self.ops)
 
@@ -148,22 +237,15 @@ class Iterator(object):
         return self
 
     def peek(self):
-        try:
-            return self.ops[self.index]
-        except IndexError:
-            return None
+        return self._op
 
     def peek_length(self):
-        next_op = self.peek()
-        if next_op is None:
+        if self._op is None:
             return None
-        return length_of(next_op) - self.offset
+        return self._length - self.offset
 
     def peek_type(self):
-        op = self.peek()
-        if op is None:
-            return 'retain'
-        return type_of(op)
+        return self._type
 
 length = length_of
 type = type_of
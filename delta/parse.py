@@ -0,0 +1,464 @@
+"""
+Streaming HTML to Delta importer, the reverse of ``delta.html``.
+
+HTML is read with lxml's ``iterparse``.  Every block (``<p>``, ``<li>``,
+``<h1>``...) becomes one line as soon as it is closed and is then
+dropped from the tree, so memory stays bounded by the largest block rather
+than the whole input.  Inline formats, embeds and line formats come from
+the ``Parser``, ``EmbedParser`` and ``BlockParser`` registries, which mirror
+``Format`` and ``BlockFormat`` in ``delta.html``.
+"""
+import io
+import logging
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+from lxml import etree
+
+from .base import DeltaBuilder
+from .embed import intern
+from .html import CLASSES, INDENT_CLASS, DIRECTION_CLASS, ALIGN_CLASS, LIST_TYPES
+
+
+logger = logging.getLogger('quill')
+
+BLOCK_TAGS = frozenset([
+    'address', 'article', 'aside', 'blockquote', 'dd', 'div', 'dl', 'dt', 'figure', 'footer',
+    'h1', 'h2', 'h3', 'h4', 'h5', 'h6', 'header', 'li', 'main', 'nav', 'ol', 'p', 'pre',
+    'section', 'table', 'tbody', 'td', 'tfoot', 'th', 'thead', 'tr', 'ul',
+])
+# blocks that only hold other blocks and are no line of their own when empty
+CONTAINER_TAGS = frozenset(['dl', 'ol', 'table', 'tbody', 'tfoot', 'thead', 'tr', 'ul'])
+SKIP_TAGS = frozenset(['head', 'noscript', 'script', 'style', 'template', 'title'])
+BLOCK_EMBEDS = frozenset(['video'])
+
+LIST_NAMES = dict((tag, name) for name, tag in LIST_TYPES.items())
+CLASS_VALUES = dict((cls, (name, value)) for name, options in CLASSES.items() for value, cls in options.items())
+
+WHITESPACE = re.compile(r'[ \t\n\r\f]+')
+BREAK = object()
+
+
+### Helpers ###
+def classes_of(element):
+    return element.attrib.get('class', '').split()
+
+def class_value(element, pattern):
+    """
+    Return the value of the first class matching a ``delta.html`` class
+    pattern such as ``'ql-align-%s'``, or ``None``.
+    """
+    prefix = pattern.split('%')[0]
+    for cls in classes_of(element):
+        if cls.startswith(prefix) and len(cls) > len(prefix):
+            return cls[len(prefix):]
+    return None
+
+def styles_of(element):
+    styles = {}
+    for declaration in element.attrib.get('style', '').split(';'):
+        name, _, value = declaration.partition(':')
+        if value.strip():
+            styles[name.strip().lower()] = value.strip()
+    return styles
+
+
+### Registry ###
+class Parser(object):
+    """
+    Inline parsers read one attribute off an inline element: ``fn(element)``
+    returns its value, or ``None`` if the element doesn't have it.  Parsers
+    with ``tags`` only see those elements, the others only see elements
+    with html attributes.
+    """
+    all = []
+    _registered = None
+    _by_tag = None
+
+    def __init__(self, fn, name, tags=None):
+        self.all.append(self)
+        self.name = name
+        self.fn = fn
+        self.tags = frozenset(tags) if tags else None
+
+    def __repr__(self):
+        return "<%s %r>" % (self.__class__.__name__, self.name)
+
+    @classmethod
+    def lookup(cls, element):
+        """
+        Return the registered parsers that apply to ``element``.
+        """
+        if cls._registered != cls.all:
+            cls._registered = list(cls.all)
+            cls._by_tag = {}
+        key = (element.tag, len(element.attrib) > 0)
+        found = cls._by_tag.get(key)
+        if found is None:
+            found = cls._by_tag[key] = [
+                p for p in cls.all if (key[1] if p.tags is None else key[0] in p.tags)]
+        return found
+
+    def value(self, element):
+        try:
+            return self.fn(element)
+        except Exception as e:
+            logger.error("Parsing format failed: %r", e)
+            return None
+
+    def __call__(self, element, attributes):
+        value = self.value(element)
+        if value is not None:
+            attributes[self.name] = value
+        return attributes
+
+
+class BlockParser(Parser):
+    """
+    Block parsers read the line formats off a block element, the ones
+    ``BlockFormat`` writes.
+    """
+    all = []
+
+
+class EmbedParser(Parser):
+    """
+    Embed parsers turn an element into the embed ``{name: value}``.
+    """
+    all = []
+
+    def __call__(self, element):
+        value = self.value(element)
+        if value is None:
+            return None
+        return intern({self.name: value})
+
+
+def parser(fn=None, name=None, cls=Parser, tags=None):
+    if isinstance(fn, str) or fn is None:
+        name = fn
+        def wrapper(fn):
+            return parser(fn, name, cls, tags)
+        return wrapper
+    return cls(fn, name or fn.__name__, tags)
+
+
+### Parsers ###
+@parser(tags=('strong', 'b'))
+def bold(element):
+    return True
+
+@parser(tags=('em', 'i'))
+def italic(element):
+    return True
+
+@parser(tags=('u',))
+def underline(element):
+    return True
+
+@parser(tags=('s', 'strike', 'del'))
+def strike(element):
+    return True
+
+@parser(tags=('sub', 'sup'))
+def script(element):
+    return 'sub' if element.tag == 'sub' else 'super'
+
+@parser
+def background(element):
+    styles = styles_of(element)
+    return styles.get('background-color') or styles.get('background')
+
+@parser
+def color(element):
+    return styles_of(element).get('color')
+
+@parser(tags=('a',))
+def link(element):
+    return element.attrib.get('href')
+
+@parser
+def font(element):
+    for cls in classes_of(element):
+        if CLASS_VALUES.get(cls, (None,))[0] == 'font':
+            return CLASS_VALUES[cls][1]
+    return None
+
+@parser
+def size(element):
+    for cls in classes_of(element):
+        if CLASS_VALUES.get(cls, (None,))[0] == 'size':
+            return CLASS_VALUES[cls][1]
+    return None
+
+@parser(tags=('img',))
+def width(element):
+    return element.attrib.get('width')
+
+@parser(tags=('img',))
+def height(element):
+    return element.attrib.get('height')
+
+@parser('align', tags=('iframe',))
+def embed_align(element):
+    return class_value(element, ALIGN_CLASS)
+
+
+### Embed Parsers ###
+@parser('image', cls=EmbedParser, tags=('img',))
+def image(element):
+    return element.attrib.get('src')
+
+@parser('video', cls=EmbedParser, tags=('iframe',))
+def video(element):
+    return element.attrib.get('src')
+
+
+### Block Parsers ###
+@parser('header', cls=BlockParser, tags=('h1', 'h2', 'h3', 'h4', 'h5', 'h6'))
+def header_block(element):
+    return int(element.tag[1])
+
+@parser('blockquote', cls=BlockParser, tags=('blockquote',))
+def blockquote(element):
+    return True
+
+@parser('code-block', cls=BlockParser, tags=('pre',))
+def code_block(element):
+    return True
+
+@parser('list', cls=BlockParser, tags=('li',))
+def list_block(element):
+    if element.attrib.get('data-list') in LIST_TYPES:
+        return element.attrib['data-list']
+    parent = element.getparent()
+    return LIST_NAMES.get(parent.tag if parent is not None else None, 'bullet')
+
+@parser('indent', cls=BlockParser, tags=BLOCK_TAGS)
+def indent(element):
+    level = class_value(element, INDENT_CLASS)
+    if level is not None and level.isdigit():
+        return int(level)
+    if element.tag == 'li':
+        # nested lists are indented lists
+        depth = sum(1 for _ in element.iterancestors('ul', 'ol')) - 1
+        return depth if depth > 0 else None
+    return None
+
+@parser('direction', cls=BlockParser)
+def direction_block(element):
+    return class_value(element, DIRECTION_CLASS)
+
+@parser('align', cls=BlockParser)
+def align_block(element):
+    return class_value(element, ALIGN_CLASS)
+
+
+### Processors ###
+def inline_attributes(element, stop):
+    """
+    Return the inline formats ``element`` and its ancestors up to ``stop``
+    apply to their content.
+    """
+    chain = []
+    while element is not None and element is not stop:
+        chain.append(element)
+        element = element.getparent()
+    attributes = {}
+    for el in reversed(chain):
+        for fmt in Parser.lookup(el):
+            fmt(el, attributes)
+    return attributes
+
+
+def normalize(segment):
+    """
+    Collapse whitespace like a browser does and strip it at both ends of
+    the line.
+    """
+    result = []
+    space = True
+    for insert, attributes in segment:
+        if isinstance(insert, str):
+            insert = WHITESPACE.sub(' ', insert)
+            if space:
+                insert = insert.lstrip(' ')
+            if not insert:
+                continue
+            space = insert.endswith(' ')
+        else:
+            space = False
+        result.append((insert, attributes))
+    while result and isinstance(result[-1][0], str):
+        text = result[-1][0].rstrip(' ')
+        if text:
+            result[-1] = (text, result[-1][1])
+            break
+        result.pop()
+    return result
+
+
+class Importer(object):
+    """
+    Builds a delta from ``iterparse`` start and end events.  ``stack``
+    holds a ``[element, line formats, has blocks]`` frame per open block.
+    """
+    def __init__(self):
+        self.builder = DeltaBuilder()
+        self.stack = []
+
+    def start(self, element):
+        tag = element.tag
+        if tag == 'body':
+            self.stack = [[element, {}, False]]
+        elif tag in BLOCK_TAGS and self.stack:
+            frame = self.stack[-1]
+            frame[2] = True
+            self.flush(element.getparent(), element, frame, loose=True)
+            attributes = dict(frame[1])
+            for fmt in BlockParser.lookup(element):
+                fmt(element, attributes)
+            self.stack.append([element, attributes, False])
+
+    def end(self, element):
+        if not self.stack or element is not self.stack[-1][0]:
+            return
+        frame = self.stack.pop()
+        force = not frame[2] and element.tag not in CONTAINER_TAGS and element.tag != 'body'
+        self.flush(element, None, frame, force=force)
+        element.clear(keep_tail=True)
+
+    def flush(self, parent, upto, frame, force=False, loose=False):
+        """
+        Emit the content of ``parent`` before its child ``upto`` (all of it
+        if ``None``) and drop it from the tree.
+        """
+        inherited = inline_attributes(parent, frame[0])
+        pieces = []
+        if parent.text:
+            pieces.append((parent.text, inherited))
+            parent.text = None
+        children = []
+        for child in parent:
+            if child is upto:
+                break
+            children.append(child)
+        for child in children:
+            self.walk(child, inherited, pieces)
+            parent.remove(child)
+        self.emit(pieces, frame[1], force, loose)
+
+    def walk(self, element, inherited, pieces):
+        tag = element.tag
+        if not isinstance(tag, str) or tag in SKIP_TAGS or tag in BLOCK_TAGS:
+            pass
+        elif tag == 'br':
+            pieces.append(BREAK)
+        else:
+            attributes = dict(inherited)
+            for fmt in Parser.lookup(element):
+                fmt(element, attributes)
+            embed = None
+            for fmt in EmbedParser.lookup(element):
+                embed = fmt(element)
+                if embed is not None:
+                    break
+            if embed is not None:
+                pieces.append((embed, attributes))
+            else:
+                if element.text:
+                    pieces.append((element.text, attributes))
+                for child in element:
+                    self.walk(child, attributes, pieces)
+        if element.tail:
+            pieces.append((element.tail, inherited))
+
+    def emit(self, pieces, line, force=False, loose=False):
+        preserve = 'code-block' in line
+        segments = [[]]
+        for piece in pieces:
+            if piece is BREAK:
+                segments.append([])
+            elif preserve and isinstance(piece[0], str) and '\n' in piece[0]:
+                for i, part in enumerate(piece[0].split('\n')):
+                    if i:
+                        segments.append([])
+                    if part:
+                        segments[-1].append((part, piece[1]))
+            else:
+                segments[-1].append(piece)
+        if not preserve:
+            segments = [normalize(s) for s in segments]
+        if len(segments) > 1 and not segments[-1]:
+            segments.pop()
+        if not force and not any(segments):
+            return
+
+        # a video before a block belongs to the line of that block
+        if loose and len(segments) == 1 and all(
+                isinstance(i, dict) and BLOCK_EMBEDS.intersection(i) for i, _ in segments[0]):
+            self.push(segments[0])
+            return
+        for segment in segments:
+            self.push(segment)
+            self.push([('\n', line)])
+
+    def push(self, segment):
+        for insert, attributes in segment:
+            if attributes:
+                self.builder.push({'insert': insert, 'attributes': attributes})
+            else:
+                self.builder.push({'insert': insert})
+
+    def delta(self):
+        return self.builder.build()
+
+
+def parse(source, encoding=None):
+    """
+    Parse HTML into a delta.  ``source`` is HTML text or bytes or a binary
+    file object, which is read incrementally.
+    """
+    if isinstance(source, str):
+        source = source.encode('utf-8')
+        encoding = 'utf-8'
+    if isinstance(source, (bytes, bytearray)):
+        source = io.BytesIO(source)
+
+    importer = Importer()
+    events = etree.iterparse(
+        source, events=('start', 'end'), html=True, encoding=encoding,
+        remove_comments=True, huge_tree=True)
+    for event, element in events:
+        if event == 'start':
+            importer.start(element)
+        else:
+            importer.end(element)
+    return importer.delta()
+
+
+def parse_file(path, encoding=None):
+    with open(path, 'rb') as f:
+        return parse(f, encoding)
+
+
+def _map(fn, items, workers, chunksize):
+    if workers == 1:
+        return [fn(item) for item in items]
+    with ProcessPoolExecutor(workers) as pool:
+        return list(pool.map(fn, items, chunksize=chunksize))
+
+
+def parse_many(sources, workers=None, chunksize=1):
+    """
+    Parse many HTML documents in ``workers`` processes (one per core by
+    default) and return their deltas in order.
+    """
+    return _map(parse, sources, workers, chunksize)
+
+
+def parse_files(paths, workers=None, chunksize=1):
+    """
+    Like ``parse_many()`` for files, which are read by the workers.
+    """
+    return _map(parse_file, paths, workers, chunksize)
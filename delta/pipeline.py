@@ -0,0 +1,211 @@
+"""
+Feed several consumers from a single walk over a document.
+
+``run(document, html=HtmlSink(), text=TextSink(), stats=StatsSink())``
+splits the document into lines once and hands every ``Line`` to each sink
+in turn, returning ``{'html': ..., 'text': ..., 'stats': ...}``.  A sink
+is any object with ``start()``, ``line(line)`` and ``finish()``; see
+``Sink``.
+"""
+import collections
+import re
+
+from . import op
+from .base import Delta, NULL_CHARACTER
+
+
+WORD = re.compile(r'\w+')
+
+Token = collections.namedtuple('Token', 'text offset line')
+Link = collections.namedtuple('Link', 'href text offset')
+
+
+class Line(object):
+    """
+    One line of a document: its content as a delta, the line formats, its
+    number, the offset it starts at and whether it ends with a newline.
+    ``text`` is computed on first use and shared by all sinks.
+    """
+    __slots__ = ('delta', 'attributes', 'index', 'offset', 'length', 'newline', '_text')
+
+    def __init__(self, delta, attributes, index, offset, newline=True):
+        self.delta = delta
+        self.attributes = attributes
+        self.index = index
+        self.offset = offset
+        self.length = sum(op.length(o) for o in delta.ops)
+        self.newline = newline
+        self._text = None
+
+    @property
+    def text(self):
+        """
+        The text of the line without its newline, embeds being
+        ``NULL_CHARACTER`` like in ``Delta.document()``.
+        """
+        if self._text is None:
+            self._text = "".join(
+                o['insert'] if isinstance(o['insert'], str) else NULL_CHARACTER
+                for o in self.delta.ops)
+        return self._text
+
+
+def lines(delta, newline='\n'):
+    """
+    Yield a ``Line`` for every line of ``delta``, like ``Delta.iter_lines()``.
+    """
+    last = delta.ops[-1].get('insert') if delta.ops else None
+    terminated = isinstance(last, str) and last.endswith(newline)
+    offset = 0
+    previous = None
+    for item in delta.iter_lines(newline):
+        if previous is not None:
+            line = Line(*previous, offset=offset)
+            offset += line.length + 1
+            yield line
+        previous = item
+    if previous is not None:
+        yield Line(*previous, offset=offset, newline=terminated)
+
+
+class Sink(object):
+    """
+    Receives every line of a document in order.  ``start()`` is called
+    before the first line and resets the sink, so one sink can serve many
+    runs; ``finish()`` returns its result.
+    """
+    def start(self):
+        pass
+
+    def line(self, line):
+        pass
+
+    def finish(self):
+        return None
+
+
+class HtmlSink(Sink):
+    """
+    Renders like ``html.render()``.
+    """
+    def __init__(self, method='html', pretty=False):
+        self.method = method
+        self.pretty = pretty
+
+    def start(self):
+        from . import html
+        self.html = html
+        self.root = html.new_root()
+
+    def line(self, line):
+        self.html.append_line(self.root, line.delta, line.attributes, line.index)
+
+    def finish(self):
+        return self.html.tostring(self.root, self.method, self.pretty)
+
+
+class TextSink(Sink):
+    """
+    Collects the plain text, like ``Delta.document()``.
+    """
+    def start(self):
+        self.parts = []
+
+    def line(self, line):
+        self.parts.append(line.text)
+        if line.newline:
+            self.parts.append('\n')
+
+    def finish(self):
+        return "".join(self.parts)
+
+
+class TokenSink(Sink):
+    """
+    Collects a ``Token`` for every match of ``pattern`` (words by default)
+    with its document offset and line number.
+    """
+    def __init__(self, pattern=WORD):
+        self.pattern = re.compile(pattern)
+
+    def start(self):
+        self.tokens = []
+
+    def line(self, line):
+        for m in self.pattern.finditer(line.text):
+            self.tokens.append(Token(m.group(), line.offset + m.start(), line.index))
+
+    def finish(self):
+        return self.tokens
+
+
+class StatsSink(Sink):
+    """
+    Counts lines, characters (text only), words and embeds by type, and
+    collects the links with their text.
+    """
+    def __init__(self, pattern=WORD):
+        self.pattern = re.compile(pattern)
+
+    def start(self):
+        self.stats = {
+            'length': 0,
+            'lines': 0,
+            'characters': 0,
+            'words': 0,
+            'embeds': collections.Counter(),
+            'links': [],
+        }
+
+    def line(self, line):
+        stats = self.stats
+        stats['lines'] += 1
+        stats['length'] += line.length + (1 if line.newline else 0)
+        stats['words'] += len(self.pattern.findall(line.text))
+
+        links = stats['links']
+        offset = line.offset
+        previous = None
+        for operator in line.delta.ops:
+            insert = operator['insert']
+            if isinstance(insert, str):
+                stats['characters'] += len(insert)
+            else:
+                stats['embeds'].update(insert.keys())
+            href = (operator.get('attributes') or {}).get('link')
+            if href is not None:
+                text = insert if isinstance(insert, str) else NULL_CHARACTER
+                # one link split over differently formatted ops
+                if previous is not None and previous.href == href and previous.offset + len(previous.text) == offset:
+                    links[-1] = previous = Link(href, previous.text + text, previous.offset)
+                else:
+                    previous = Link(href, text, offset)
+                    links.append(previous)
+            offset += op.length(operator)
+
+    def finish(self):
+        self.stats['embeds'] = dict(self.stats['embeds'])
+        return self.stats
+
+
+class Pipeline(object):
+    """
+    A named set of sinks, fed from one pass over each document it runs on.
+    """
+    def __init__(self, **sinks):
+        self.sinks = sinks
+
+    def run(self, delta, newline='\n'):
+        if not isinstance(delta, Delta):
+            delta = Delta(delta)
+        sinks = sorted(self.sinks.items())
+        for name, sink in sinks:
+            sink.start()
+        for line in lines(delta, newline):
+            for name, sink in sinks:
+                sink.line(line)
+        return dict((name, sink.finish()) for name, sink in sinks)
+
+
+def run(delta, **sinks):
+    return Pipeline(**sinks).run(delta)
@@ -0,0 +1,184 @@
+import asyncio
+import logging
+
+from .base import Delta
+from .history import History
+
+
+logger = logging.getLogger('quill')
+
+class LocalTransport(object):
+    """
+    In-memory transport, mostly for tests: every connected client gets an
+    ``asyncio.Queue`` inbox that receives ``(doc_id, client, revision, change)``
+    for each commit.  Clients never receive their own commits back.
+    """
+    def __init__(self):
+        self.inboxes = {}
+
+    def connect(self, doc_id, client):
+        inbox = asyncio.Queue()
+        self.inboxes.setdefault(doc_id, {})[client] = inbox
+        return inbox
+
+    def disconnect(self, doc_id, client):
+        self.inboxes.get(doc_id, {}).pop(client, None)
+
+    async def broadcast(self, doc_id, client, revision, change):
+        for other, inbox in self.inboxes.get(doc_id, {}).items():
+            if other != client:
+                inbox.put_nowait((doc_id, client, revision, change))
+
+
+class Session(object):
+    """
+    Serializes the edits of a single document.
+
+    Clients ``submit()`` a change made against some base revision.  A single
+    worker task takes changes off the queue in batches, transforms each one
+    against the changes committed since its base, composes it into the
+    document and hands it to ``broadcast(doc_id, client, revision, change)``.
+    The queue is bounded, so fast submitters wait instead of growing memory.
+
+    With a ``validator`` (see ``delta.validate``) malformed changes are
+    rejected in ``submit()`` before they are queued, and changes that reach
+    past the end of the document when they are committed.
+    """
+    def __init__(self, doc_id, document=None, revision=0, broadcast=None, maxsize=1024, batch_size=64,
+                 validator=None):
+        self.doc_id = doc_id
+        self.document = Delta(document)
+        self.history = History(self.document, revision)
+        self.broadcast = broadcast
+        self.batch_size = batch_size
+        self.validator = validator
+        self.queue = asyncio.Queue(maxsize)
+        self.task = None
+        self.stopped = False
+
+    @property
+    def revision(self):
+        return self.history.revision
+
+    def start(self):
+        self.stopped = False
+        if self.task is None:
+            self.task = asyncio.ensure_future(self.run())
+        return self.task
+
+    async def stop(self):
+        """
+        Stop the worker.  Changes still queued are not committed: their
+        ``submit()`` calls are cancelled.
+        """
+        self.stopped = True
+        if self.task is not None:
+            self.task.cancel()
+            try:
+                await self.task
+            except asyncio.CancelledError:
+                pass
+            self.task = None
+        while not self.queue.empty():
+            self.queue.get_nowait()[3].cancel()
+
+    async def submit(self, client, revision, change):
+        """
+        Queue ``change`` made against ``revision`` and wait for it to be
+        committed.  Returns ``(revision, change)`` with the transformed change.
+        """
+        change = Delta(change)
+        if self.validator is not None:
+            self.validator.validate(change)
+        future = asyncio.get_event_loop().create_future()
+        await self.queue.put((client, revision, change, future))
+        if self.stopped:
+            # stop() drained the queue while we were waiting for room
+            future.cancel()
+        return await future
+
+    def concurrent(self, revision, cache):
+        """
+        Return the composition of everything committed after ``revision``.
+        Clients in the same batch that are behind from the same base share
+        one composed delta that is only extended by the newer commits, so
+        each of them costs a single transform.
+        """
+        upto, composed = cache.get(revision, (revision, Delta()))
+        for change in self.history.since(upto):
+            composed = composed.compose(change)
+        cache[revision] = (self.revision, composed)
+        return composed
+
+    async def commit(self, batch):
+        cache = {}
+        for client, revision, change, future in batch:
+            if future.cancelled():
+                continue
+            try:
+                if revision > self.revision:
+                    raise ValueError("revision %d is ahead of the document (%d)" % (revision, self.revision))
+                if revision < self.revision:
+                    change = self.concurrent(revision, cache).transform(change, True)
+                if self.validator is not None:
+                    self.validator.validate(change, self.document)
+                self.document = self.document.compose(change)
+                committed = self.history.apply(change)
+            except Exception as e:
+                future.set_exception(e)
+                continue
+            # the change is in, whatever happens to the broadcast
+            future.set_result((committed, change))
+            if self.broadcast is not None:
+                try:
+                    await self.broadcast(self.doc_id, client, committed, change)
+                except Exception:
+                    logger.exception("Broadcasting revision %d of %r failed", committed, self.doc_id)
+
+    async def run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.batch_size and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self.commit(batch)
+            except asyncio.CancelledError:
+                for item in batch:
+                    if not item[3].done():
+                        item[3].cancel()
+                raise
+
+
+class Engine(object):
+    """
+    Owns one ``Session`` per document.  ``load(doc_id)`` may be overridden to
+    fetch ``(document, revision)`` for a document on first use.
+    """
+    def __init__(self, transport=None, maxsize=1024, batch_size=64, validator=None):
+        self.transport = transport
+        self.maxsize = maxsize
+        self.batch_size = batch_size
+        self.validator = validator
+        self.sessions = {}
+
+    def load(self, doc_id):
+        return Delta(), 0
+
+    def session(self, doc_id):
+        session = self.sessions.get(doc_id)
+        if session is None:
+            document, revision = self.load(doc_id)
+            broadcast = self.transport.broadcast if self.transport is not None else None
+            session = Session(doc_id, document, revision, broadcast, self.maxsize, self.batch_size,
+                              self.validator)
+            session.start()
+            self.sessions[doc_id] = session
+        return session
+
+    async def submit(self, doc_id, client, revision, change):
+        return await self.session(doc_id).submit(client, revision, change)
+
+    async def close(self):
+        for session in list(self.sessions.values()):
+            await session.stop()
+        self.sessions.clear()
@@ -0,0 +1,211 @@
+import bisect
+import hashlib
+import multiprocessing
+import threading
+
+from .base import Delta
+
+
+def hash_key(key):
+    return int(hashlib.md5(str(key).encode('utf-8')).hexdigest()[:16], 16)
+
+
+class HashRing(object):
+    """
+    Consistent hash ring mapping keys to nodes.  Each node is placed on the
+    ring ``replicas`` times so that adding or removing a node only moves
+    about ``1/len(nodes)`` of the keys.
+    """
+    def __init__(self, nodes=(), replicas=64):
+        self.replicas = replicas
+        self.hashes = []
+        self.nodes = {}
+        for node in nodes:
+            self.add(node)
+
+    def __len__(self):
+        return len(set(self.nodes.values()))
+
+    def add(self, node):
+        for i in range(self.replicas):
+            h = hash_key("%s:%d" % (node, i))
+            if h not in self.nodes:
+                bisect.insort(self.hashes, h)
+            self.nodes[h] = node
+
+    def remove(self, node):
+        for i in range(self.replicas):
+            h = hash_key("%s:%d" % (node, i))
+            if self.nodes.get(h) == node:
+                del self.nodes[h]
+                self.hashes.remove(h)
+
+    def get(self, key):
+        if not self.hashes:
+            raise LookupError("hash ring is empty")
+        index = bisect.bisect(self.hashes, hash_key(key)) % len(self.hashes)
+        return self.nodes[self.hashes[index]]
+
+
+class Moved(LookupError):
+    """
+    Raised by a worker for a document it handed over to another worker.
+    """
+
+
+def serve(conn):
+    """
+    Worker process main loop.  The worker is the only writer of the
+    documents it holds; requests arrive over ``conn`` one at a time.
+    """
+    documents = {}
+    moved = set()
+    while True:
+        try:
+            command, args = conn.recv()
+        except EOFError:
+            break
+        try:
+            if command in ('apply', 'get') and (args[0] if command == 'apply' else args) in moved:
+                raise Moved(args)
+            if command == 'apply':
+                doc_id, ops = args
+                document, revision = documents.get(doc_id, (Delta(), 0))
+                document = document.compose(Delta(ops))
+                documents[doc_id] = (document, revision + 1)
+                result = revision + 1
+            elif command == 'get':
+                document, revision = documents.get(args, (Delta(), 0))
+                result = (document.ops, revision)
+            elif command == 'load':
+                doc_id, ops, revision = args
+                documents[doc_id] = (Delta(ops), revision)
+                moved.discard(doc_id)
+                result = None
+            elif command == 'drop':
+                document, revision = documents.pop(args, (Delta(), 0))
+                moved.add(args)
+                result = (document.ops, revision)
+            elif command == 'stop':
+                conn.send((True, None))
+                break
+            else:
+                raise ValueError("unknown command: %r" % command)
+        except Exception as e:
+            conn.send((False, e))
+        else:
+            conn.send((True, result))
+    conn.close()
+
+
+class Worker(object):
+    def __init__(self, name, context):
+        self.name = name
+        self.conn, child = context.Pipe()
+        self.process = context.Process(target=serve, args=(child,), name='delta-shard-%s' % name)
+        self.process.daemon = True
+        self.process.start()
+        child.close()
+        self.lock = threading.Lock()
+
+    def call(self, command, args=None):
+        with self.lock:
+            self.conn.send((command, args))
+            ok, result = self.conn.recv()
+        if not ok:
+            raise result
+        return result
+
+    def stop(self):
+        try:
+            self.call('stop')
+        except (EOFError, OSError):
+            pass
+        self.process.join()
+
+
+class ShardPool(object):
+    """
+    Pins every document to one worker process by consistent hashing.
+
+    Calls for documents owned by different workers run in parallel (from
+    different threads); calls for the same document are serialized by its
+    worker, which keeps a single writer per document.  ``add_worker()``
+    migrates the documents whose owner changed to the new worker.
+    """
+    def __init__(self, workers=None, replicas=64, context=None):
+        self.context = context or multiprocessing.get_context()
+        self.ring = HashRing(replicas=replicas)
+        self.workers = {}
+        self.owners = {}
+        self.lock = threading.RLock()
+        for i in range(workers or multiprocessing.cpu_count()):
+            self.add_worker()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def worker(self, doc_id):
+        with self.lock:
+            name = self.owners.get(doc_id)
+            if name is None:
+                name = self.owners[doc_id] = self.ring.get(doc_id)
+            return self.workers[name]
+
+    def apply(self, doc_id, change):
+        """
+        Compose ``change`` into the document and return its new revision.
+        """
+        if hasattr(change, 'ops'):
+            change = change.ops
+        return self.call(doc_id, 'apply', (doc_id, change))
+
+    def document(self, doc_id):
+        ops, revision = self.call(doc_id, 'get', doc_id)
+        return Delta(ops), revision
+
+    def call(self, doc_id, command, args):
+        # A rebalance may move the document between routing and the call;
+        # the old worker then refuses it and we route again.
+        while True:
+            try:
+                return self.worker(doc_id).call(command, args)
+            except Moved:
+                continue
+
+    def load(self, doc_id, document, revision=0):
+        if hasattr(document, 'ops'):
+            document = document.ops
+        self.call(doc_id, 'load', (doc_id, document, revision))
+
+    def add_worker(self, name=None):
+        with self.lock:
+            if name is None:
+                name = 'w%d' % len(self.workers)
+            self.workers[name] = Worker(name, self.context)
+            self.ring.add(name)
+            self.rebalance()
+        return name
+
+    def rebalance(self):
+        """
+        Move every known document to the worker the ring assigns it to.
+        """
+        with self.lock:
+            for doc_id, current in list(self.owners.items()):
+                owner = self.ring.get(doc_id)
+                if owner == current:
+                    continue
+                ops, revision = self.workers[current].call('drop', doc_id)
+                self.workers[owner].call('load', (doc_id, ops, revision))
+                self.owners[doc_id] = owner
+
+    def close(self):
+        with self.lock:
+            for worker in self.workers.values():
+                worker.stop()
+            self.workers.clear()
+            self.owners.clear()
@@ -0,0 +1,207 @@
+"""
+Realistic editing traces and a replay harness.
+
+A trace is a list of events ``{'client': ..., 'revision': ..., 'ops': [...]}``:
+a change made by a client against the document at some revision.  Replaying
+rebases each change over the commits made since its revision with
+``transform`` and composes it into the document, like a collaboration server
+does.  Run with ``python -m delta.trace``.
+"""
+import argparse
+import json
+import random
+import string
+import sys
+import time
+import tracemalloc
+
+from .base import Delta
+from .history import History
+
+
+ACTIONS = [
+    ('type', 70),
+    ('backspace', 10),
+    ('newline', 5),
+    ('paste', 5),
+    ('format', 10),
+]
+FORMATS = [{'bold': True}, {'italic': True}, {'bold': None}, {'link': 'https://quilljs.com'}]
+
+
+class Server(object):
+    """
+    Applies changes made against older revisions of a document.
+    """
+    def __init__(self, document=None):
+        self.document = Delta(document)
+        self.history = History(self.document)
+
+    @property
+    def revision(self):
+        return self.history.revision
+
+    def apply(self, revision, change):
+        for committed in self.history.since(revision):
+            change = committed.transform(change, True)
+        self.document = self.document.compose(change)
+        self.history.apply(change)
+        return change
+
+
+class Client(object):
+    def __init__(self, name, server, rng):
+        self.name = name
+        self.rng = rng
+        self.cursor = 0
+        self.sync(server)
+
+    def sync(self, server):
+        self.revision = server.revision
+        self.document = server.document
+        self.cursor = min(self.cursor, max(len(self.document) - 1, 0))
+
+    def edit(self):
+        length = len(self.document)
+        cursor = self.cursor = min(self.cursor, max(length - 1, 0))
+        action = self.rng.choices([a for a, _ in ACTIONS], [w for _, w in ACTIONS])[0]
+        if self.rng.random() < 0.05:
+            # Jump somewhere else in the document
+            cursor = self.cursor = self.rng.randint(0, max(length - 1, 0))
+
+        change = Delta().retain(cursor)
+        if action == 'type':
+            text = self.rng.choice(string.ascii_lowercase + '  ')
+            self.cursor += 1
+            change.insert(text)
+        elif action == 'newline':
+            self.cursor += 1
+            change.insert('\n')
+        elif action == 'paste':
+            words = [''.join(self.rng.choice(string.ascii_lowercase) for _ in range(self.rng.randint(1, 9)))
+                     for _ in range(self.rng.randint(5, 200))]
+            text = ' '.join(words)
+            self.cursor += len(text)
+            change.insert(text)
+        elif action == 'backspace' and cursor > 0:
+            self.cursor -= 1
+            change = Delta().retain(cursor - 1).delete(1)
+        elif action == 'format' and cursor < length - 1:
+            span = self.rng.randint(1, min(length - 1 - cursor, 200))
+            change.retain(span, **self.rng.choice(FORMATS))
+        else:
+            return None
+        return change
+
+
+def generate(steps=1000, clients=3, sync=0.7, document=None, seed=0):
+    """
+    Generate a trace of ``steps`` events by ``clients`` simulated editors.
+    After each of its edits a client picks up the latest document with
+    probability ``sync``; otherwise its next edit is made against the stale
+    revision and has to be rebased over everything committed since.
+    """
+    rng = random.Random(seed)
+    server = Server(document or Delta().insert('\n'))
+    editors = [Client('client-%d' % i, server, rng) for i in range(clients)]
+    trace = []
+    while len(trace) < steps:
+        client = rng.choice(editors)
+        change = client.edit()
+        if change is None or not change.chop().ops:
+            continue
+        trace.append({'client': client.name, 'revision': client.revision, 'ops': change.ops})
+        server.apply(client.revision, change)
+        if rng.random() < sync:
+            client.sync(server)
+    return trace
+
+
+def save(trace, path):
+    with open(path, 'w') as f:
+        for event in trace:
+            f.write(json.dumps(event))
+            f.write('\n')
+
+
+def load(path):
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(int(len(values) * fraction), len(values) - 1)]
+
+
+def replay(trace, document=None, memory=True):
+    """
+    Replay ``trace`` and return the resulting document and a report with the
+    throughput, per-event latency percentiles and peak traced memory.
+    Memory is measured in a second, untimed replay.
+    """
+    base = document or Delta().insert('\n')
+    changes = [(event['revision'], Delta(event['ops'])) for event in trace]
+    server = Server(base)
+    latencies = []
+    start = time.perf_counter()
+    for revision, change in changes:
+        before = time.perf_counter()
+        server.apply(revision, change)
+        latencies.append(time.perf_counter() - before)
+    elapsed = time.perf_counter() - start
+
+    peak = None
+    if memory:
+        # tracing slows allocation down, so memory gets its own pass
+        traced = Server(base)
+        tracemalloc.start()
+        try:
+            for revision, change in changes:
+                traced.apply(revision, change)
+            peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    report = {
+        'events': len(changes),
+        'seconds': elapsed,
+        'throughput': len(changes) / elapsed if elapsed else 0.0,
+        'p50': percentile(latencies, 0.50),
+        'p90': percentile(latencies, 0.90),
+        'p99': percentile(latencies, 0.99),
+        'max': max(latencies) if latencies else 0.0,
+        'peak_memory': peak,
+        'length': len(server.document),
+    }
+    return server.document, report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m delta.trace', description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--steps', type=int, default=2000)
+    parser.add_argument('--clients', type=int, default=3)
+    parser.add_argument('--sync', type=float, default=0.7, help="probability a client syncs after an edit")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--load', metavar='PATH', help="replay a recorded trace instead of generating one")
+    parser.add_argument('--save', metavar='PATH', help="record the generated trace")
+    parser.add_argument('--no-memory', action='store_true', help="don't trace memory (faster)")
+    args = parser.parse_args(argv)
+
+    if args.load:
+        trace = load(args.load)
+    else:
+        trace = generate(args.steps, args.clients, args.sync, seed=args.seed)
+    if args.save:
+        save(trace, args.save)
+
+    _, report = replay(trace, memory=not args.no_memory)
+    json.dump(report, sys.stdout, indent=2)
+    sys.stdout.write('\n')
+    return report
+
+
+if __name__ == '__main__':
+    main()
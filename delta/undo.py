@@ -0,0 +1,106 @@
+import time
+
+
+class UndoManager(object):
+    """
+    Undo/redo stacks of inverted changes, modelled on Quill's history module.
+
+    Changes recorded within ``delay`` seconds of each other are merged into a
+    single undo step.  Remote changes must be passed to ``transform()`` so the
+    stacks keep applying to the current document.  Each stack is capped both
+    by number of steps (``max_stack``) and by the number of ops it holds
+    (``max_ops``); the oldest steps are dropped first.
+    """
+    def __init__(self, delay=1.0, max_stack=100, max_ops=None):
+        self.delay = delay
+        self.max_stack = max_stack
+        self.max_ops = max_ops
+        self.undo_stack = []
+        self.redo_stack = []
+        self.last_recorded = 0
+
+    def clear(self):
+        self.undo_stack = []
+        self.redo_stack = []
+
+    def cutoff(self):
+        """
+        Stop merging: the next recorded change starts a new undo step.
+        """
+        self.last_recorded = 0
+
+    def record(self, change, old_document, timestamp=None):
+        """
+        Record a local ``change`` applied to ``old_document``.
+        """
+        if not change.ops:
+            return
+        self.redo_stack = []
+        undo = change.invert(old_document)
+        if timestamp is None:
+            timestamp = time.time()
+
+        if self.undo_stack and self.last_recorded + self.delay > timestamp:
+            last = self.undo_stack.pop()
+            undo = undo.compose(last['undo'])
+            change = last['redo'].compose(change)
+        else:
+            self.last_recorded = timestamp
+
+        if not undo.ops:
+            return
+        self.undo_stack.append({'redo': change, 'undo': undo})
+        self.trim(self.undo_stack)
+
+    def transform(self, change):
+        """
+        Rebase both stacks over a remote ``change``.
+        """
+        transform_stack(self.undo_stack, change)
+        transform_stack(self.redo_stack, change)
+
+    def undo(self):
+        """
+        Return the delta that undoes the last step, or ``None``.
+        """
+        return self.change(self.undo_stack, self.redo_stack, 'undo')
+
+    def redo(self):
+        """
+        Return the delta that redoes the last undone step, or ``None``.
+        """
+        return self.change(self.redo_stack, self.undo_stack, 'redo')
+
+    def change(self, source, dest, key):
+        if not source:
+            return None
+        entry = source.pop()
+        dest.append(entry)
+        self.trim(dest)
+        self.cutoff()
+        return entry[key]
+
+    def trim(self, stack):
+        if self.max_stack is not None:
+            del stack[:max(len(stack) - self.max_stack, 0)]
+        if self.max_ops is not None:
+            total = sum(stack_size(entry) for entry in stack)
+            while stack and total > self.max_ops:
+                total -= stack_size(stack.pop(0))
+
+
+def stack_size(entry):
+    return len(entry['undo'].ops) + len(entry['redo'].ops)
+
+
+def transform_stack(stack, change):
+    remote = change
+    for i in range(len(stack) - 1, -1, -1):
+        entry = stack[i]
+        stack[i] = {
+            'undo': remote.transform(entry['undo'], True),
+            'redo': remote.transform(entry['redo'], True),
+        }
+        remote = entry['undo'].transform(remote)
+        if stack[i]['undo'].length() == 0:
+            del stack[i]
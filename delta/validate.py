@@ -0,0 +1,232 @@
+"""
+Cheap checks for deltas coming from untrusted clients.
+
+``Validator`` checks the structure and types of every op, an optional
+attribute schema, limits on op count, inserted text and attribute size,
+and that the delta doesn't reach past the end of its base document, all in
+one pass.  Bad input raises ``ValidationError`` before it gets anywhere
+near ``compose()`` or ``transform()``.
+
+A schema maps attribute names to a rule: a type or tuple of types, a
+collection of allowed values, a predicate, or ``None`` for any value.
+``None`` as an attribute value is always allowed since it removes a
+format.
+"""
+from . import metrics
+
+
+MAX_OPS = 10000
+MAX_INSERT = 1000000
+MAX_ATTRIBUTES = 32
+MAX_ATTRIBUTE_SIZE = 2048
+MAX_DEPTH = 8
+
+QUILL_ATTRIBUTES = {
+    'bold': bool,
+    'italic': bool,
+    'underline': bool,
+    'strike': bool,
+    'code': bool,
+    'script': ('sub', 'super'),
+    'color': str,
+    'background': str,
+    'font': str,
+    'size': str,
+    'link': (str, dict),
+    'width': (str, int),
+    'height': (str, int),
+    'header': range(1, 7),
+    'list': ('ordered', 'bullet', 'checked', 'unchecked'),
+    'indent': range(1, 9),
+    'align': ('left', 'center', 'right', 'justify'),
+    'direction': ('rtl',),
+    'blockquote': bool,
+    'code-block': (bool, str),
+}
+
+
+class ValidationError(ValueError):
+    def __init__(self, message, index=None):
+        if index is not None:
+            message = "op %d: %s" % (index, message)
+        super(ValidationError, self).__init__(message)
+        self.index = index
+
+
+def compile_rule(rule):
+    """
+    Turn a schema rule into a predicate on attribute values.
+    """
+    if rule is None:
+        return lambda value: True
+    if isinstance(rule, type) or (isinstance(rule, tuple) and rule and all(isinstance(r, type) for r in rule)):
+        types = rule if isinstance(rule, tuple) else (rule,)
+        exact = bool in types or int not in types
+        # True and False are ints, but not what an int rule means
+        return lambda value: isinstance(value, types) and (exact or not isinstance(value, bool))
+    if isinstance(rule, (tuple, list, set, frozenset, range)):
+        allowed = rule if isinstance(rule, range) else frozenset(rule)
+        def check(value):
+            try:
+                return not isinstance(value, bool) and value in allowed
+            except TypeError:
+                return False
+        return check
+    if callable(rule):
+        return rule
+    raise TypeError("invalid schema rule: %r" % (rule,))
+
+
+def size_of(value, limit, depth=0):
+    """
+    Return the approximate size of a JSON value: the length of its strings
+    and keys plus one per other value.  Counting stops past ``limit``.
+    """
+    if isinstance(value, str):
+        return len(value)
+    if value is None or isinstance(value, (bool, int, float)):
+        return 1
+    if depth >= MAX_DEPTH:
+        raise ValidationError("value nested deeper than %d levels" % MAX_DEPTH)
+    total = 0
+    if isinstance(value, dict):
+        for k, v in value.items():
+            if not isinstance(k, str):
+                raise ValidationError("non-string key %r" % (k,))
+            total += len(k) + size_of(v, limit - total, depth + 1)
+            if total > limit:
+                break
+    elif isinstance(value, (list, tuple)):
+        for v in value:
+            total += size_of(v, limit - total, depth + 1)
+            if total > limit:
+                break
+    else:
+        raise ValidationError("%s is not a JSON value" % type(value).__name__)
+    return total
+
+
+class Validator(object):
+    """
+    Validates deltas against an attribute schema and size limits, each of
+    which can be turned off with ``None``.  Attributes missing from a
+    schema are rejected unless ``unknown`` is true.
+    """
+    def __init__(self, attributes=None, unknown=True, max_ops=MAX_OPS, max_insert=MAX_INSERT,
+                 max_attributes=MAX_ATTRIBUTES, max_attribute_size=MAX_ATTRIBUTE_SIZE):
+        self.rules = dict((name, compile_rule(rule)) for name, rule in (attributes or {}).items())
+        self.unknown = unknown
+        self.max_ops = max_ops
+        self.max_insert = max_insert
+        self.max_attributes = max_attributes
+        self.max_attribute_size = max_attribute_size
+
+    def validate(self, delta, base=None, document=False):
+        """
+        Check ``delta`` (a ``Delta`` or a list of ops) and return it.
+        ``base`` is the document it applies to or its length; ``document``
+        only allows inserts.
+        """
+        try:
+            self._validate(getattr(delta, 'ops', delta), base, document)
+        except ValidationError:
+            if metrics.enabled:
+                metrics.incr('validate.errors')
+            raise
+        return delta
+
+    def _validate(self, ops, base, document):
+        if not isinstance(ops, list):
+            raise ValidationError("ops must be a list, not %s" % type(ops).__name__)
+        if self.max_ops is not None and len(ops) > self.max_ops:
+            raise ValidationError("%d ops is more than the limit of %d" % (len(ops), self.max_ops))
+
+        consumed = inserted = 0
+        for i, operator in enumerate(ops):
+            if not isinstance(operator, dict):
+                raise ValidationError("expected a dict, got %s" % type(operator).__name__, i)
+            if 'insert' in operator:
+                typ = 'insert'
+            elif 'retain' in operator:
+                typ = 'retain'
+            elif 'delete' in operator:
+                typ = 'delete'
+            else:
+                raise ValidationError("no insert, retain or delete", i)
+            has_attributes = 'attributes' in operator
+            if len(operator) != 1 + has_attributes:
+                extra = sorted(str(k) for k in operator if k not in (typ, 'attributes'))
+                raise ValidationError("unexpected keys: %s" % ", ".join(extra), i)
+
+            value = operator[typ]
+            if typ == 'insert':
+                if isinstance(value, str):
+                    if not value:
+                        raise ValidationError("empty insert", i)
+                    inserted += len(value)
+                elif isinstance(value, dict):
+                    if not value:
+                        raise ValidationError("empty embed", i)
+                    if self.max_attribute_size is not None and \
+                            size_of(value, self.max_attribute_size) > self.max_attribute_size:
+                        raise ValidationError("embed is larger than %d" % self.max_attribute_size, i)
+                    inserted += 1
+                else:
+                    raise ValidationError("insert must be a string or an embed dict, not %s" % type(value).__name__, i)
+                if self.max_insert is not None and inserted > self.max_insert:
+                    raise ValidationError("inserts more than the limit of %d characters" % self.max_insert, i)
+            else:
+                if document:
+                    raise ValidationError("documents can only contain inserts", i)
+                # bool is an int, but not a length
+                if type(value) is not int:
+                    raise ValidationError("%s must be an integer, not %s" % (typ, type(value).__name__), i)
+                if value <= 0:
+                    raise ValidationError("%s must be positive, not %d" % (typ, value), i)
+                consumed += value
+
+            if has_attributes:
+                if typ == 'delete':
+                    raise ValidationError("delete can't have attributes", i)
+                self._check_attributes(operator['attributes'], i)
+
+        if base is not None:
+            length = base if isinstance(base, int) else len(base)
+            if consumed > length:
+                raise ValidationError("reaches offset %d of a document of length %d" % (consumed, length))
+
+    def _check_attributes(self, attributes, i):
+        if not isinstance(attributes, dict):
+            raise ValidationError("attributes must be a dict, not %s" % type(attributes).__name__, i)
+        if self.max_attributes is not None and len(attributes) > self.max_attributes:
+            raise ValidationError("%d attributes is more than the limit of %d" % (len(attributes), self.max_attributes), i)
+        limit = self.max_attribute_size
+        size = 0
+        for name, value in attributes.items():
+            if not isinstance(name, str):
+                raise ValidationError("attribute name %r is not a string" % (name,), i)
+            if value is None:
+                continue
+            rule = self.rules.get(name)
+            if rule is None:
+                if not self.unknown:
+                    raise ValidationError("unknown attribute %r" % name, i)
+            elif not rule(value):
+                raise ValidationError("invalid value for %r: %r" % (name, value), i)
+            if limit is not None:
+                size += len(name) + size_of(value, limit - size)
+                if size > limit:
+                    raise ValidationError("attributes are larger than %d" % limit, i)
+            elif not isinstance(value, (str, bool, int, float)):
+                size_of(value, float('inf'))
+
+
+default = Validator()
+
+
+def validate(delta, base=None, document=False, validator=None):
+    """
+    Validate with ``validator``, or the default one that only checks
+    structure and limits.
+    """
+    return (validator or default).validate(delta, base, document)
@@ -0,0 +1,82 @@
+import asyncio
+import time
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from delta import Delta
+from delta import aio
+
+
+def run(coro):
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(coro)
+    finally:
+        loop.close()
+
+
+def test_inline_below_threshold():
+    seen = []
+    def fn():
+        seen.append(threading.current_thread())
+        return 1
+
+    assert run(aio.run(fn, size=1, min_ops=10)) == 1
+    assert seen == [threading.main_thread()]
+
+    assert run(aio.run(fn, size=10, min_ops=10)) == 1
+    assert seen[1] is not threading.main_thread()
+
+    assert run(aio.run(fn, length=5, min_length=10)) == 1
+    assert seen[2] is threading.main_thread()
+    assert run(aio.run(fn, size=1, length=10, min_ops=10, min_length=10)) == 1
+    assert seen[3] is not threading.main_thread()
+
+
+def test_thresholds_by_cost(monkeypatch):
+    seen = []
+    run_inline = aio.run
+    def spy(*args, **kwargs):
+        seen.append((kwargs.get('size'), kwargs.get('length')))
+        return run_inline(*args, **kwargs)
+    monkeypatch.setattr(aio, 'run', spy)
+
+    # a single op holding a large document is still expensive to diff and render
+    document = Delta().insert('x' * 100 + '\n')
+    run(aio.diff(document, Delta().insert('\n')))
+    run(aio.render(document))
+    run(aio.compose(document, Delta().delete(1)))
+    assert seen == [(None, 102), (None, 101), (2, None)]
+
+
+def test_wrappers():
+    a = Delta().insert('Hello')
+    b = Delta().retain(5).insert('!')
+
+    assert run(aio.compose(a, b)) == a.compose(b)
+    assert run(aio.compose(a, b, min_ops=0)) == a.compose(b)
+    assert run(aio.compose_many([a, b, Delta().delete(1)], min_ops=0)) == Delta().insert('ello!')
+    assert run(aio.transform(b, Delta().insert('>'), True, min_ops=0)) == Delta().insert('>')
+    assert run(aio.diff(a, Delta().insert('Help'), min_length=0)) == Delta().retain(3).insert('p').delete(2)
+    assert run(aio.render(Delta().insert('Hi\n'), min_length=0)) == '<p>Hi</p>'
+
+
+def test_timeout():
+    with ThreadPoolExecutor(1) as pool:
+        with pytest.raises(asyncio.TimeoutError):
+            run(aio.run(time.sleep, 0.5, timeout=0.01, pool=pool))
+
+
+def test_configure_process_pool():
+    a = Delta().insert('Hello')
+    b = Delta().retain(5).insert('!')
+    with ProcessPoolExecutor(1) as pool:
+        aio.configure(pool, 0, 0)
+        try:
+            assert run(aio.compose(a, b)) == Delta().insert('Hello!')
+            assert run(aio.diff(a, Delta().insert('Help'))) == Delta().retain(3).insert('p').delete(2)
+        finally:
+            aio.configure()
+    assert aio.executor is None
+    assert aio.threshold == aio.THRESHOLD
+    assert aio.length_threshold == aio.LENGTH_THRESHOLD
@@ -0,0 +1,51 @@
+import pytest
+from delta import Delta
+from delta import archive
+from delta.binary import DecodeError
+
+
+def make_documents():
+    return dict(('doc-%d' % i, Delta().insert('Document %d' % i, bold=bool(i % 2)).insert('\n', header=1))
+                for i in range(50))
+
+
+def test_random_access(tmp_path):
+    path = str(tmp_path / 'docs.qda')
+    documents = make_documents()
+    archive.write(path, documents)
+
+    with archive.open_archive(path) as reader:
+        assert len(reader) == 50
+        assert 'doc-7' in reader
+        assert reader['doc-7'] == documents['doc-7']
+        assert reader.get('missing') is None
+        with pytest.raises(KeyError):
+            reader['missing']
+
+
+def test_iterate(tmp_path):
+    path = str(tmp_path / 'docs.qda')
+    documents = make_documents()
+    archive.write(path, documents)
+
+    with archive.open_archive(path) as reader:
+        assert dict(reader) == documents
+        assert [key for key, _ in reader] == list(documents)
+
+
+def test_writer(tmp_path):
+    path = str(tmp_path / 'docs.qda')
+    with archive.Writer(path) as writer:
+        writer.add('a', Delta().insert('A'))
+        with pytest.raises(KeyError):
+            writer.add('a', Delta().insert('B'))
+
+    with archive.Reader(path) as reader:
+        assert reader['a'] == Delta().insert('A')
+
+
+def test_not_an_archive(tmp_path):
+    path = tmp_path / 'bogus.qda'
+    path.write_bytes(b'{"ops": []}')
+    with pytest.raises(DecodeError):
+        archive.Reader(str(path))
@@ -0,0 +1,30 @@
+import json
+from delta import benchmark
+
+
+def test_generate_document():
+    document = benchmark.generate_document(1000, fragment=5)
+
+    assert len(document) >= 1000
+    assert document.document().endswith('\n')
+    assert document == benchmark.generate_document(1000, fragment=5)
+    assert len(document.ops) > len(benchmark.generate_document(1000, fragment=50).ops)
+
+
+def test_generate_change():
+    document = benchmark.generate_document(500)
+    for seed in range(20):
+        change = benchmark.generate_change(document, seed)
+        # Still a document, with the final newline untouched
+        assert document.compose(change).document().endswith('\n')
+
+
+def test_main(tmp_path):
+    path = str(tmp_path / 'results.json')
+    results = benchmark.main(['compose', 'getitem', '--sizes', '100', '--fragments', '10',
+                              '--repeat', '1', '--min-time', '0', '--json', path])
+
+    assert [r['case'] for r in results] == ['compose', 'getitem']
+    assert all(r['seconds'] > 0 for r in results)
+    with open(path) as f:
+        assert json.load(f)['results'] == results
@@ -0,0 +1,92 @@
+import json
+import pytest
+from delta import Delta
+from delta import binary
+
+
+def test_round_trip():
+    delta = Delta().insert('Hello ', bold=True, color='#ff0000') \
+                   .insert('Wörld 🌍', bold=True) \
+                   .insert({'image': 'octocat.png'}, width='100', alt=None) \
+                   .insert('\n', list='ordered', indent=2) \
+                   .insert({'formula': {'tex': 'e^x', 'scale': 1.5, 'tags': [1, -300, False]}})
+    data = binary.encode(delta)
+
+    assert binary.decode(data) == delta
+    assert len(data) < len(json.dumps(delta.ops)) / 2
+
+
+def test_change_round_trip():
+    delta = Delta().retain(100000).delete(3).insert('A').retain(5, bold=None)
+    assert binary.decode(binary.encode(delta)) == delta
+    assert binary.decode(binary.encode(Delta())) == Delta()
+
+
+def test_key_table():
+    delta = Delta().insert('a', bold=True).insert('b', italic=True, bold=True)
+    data = binary.encode(delta)
+    assert data.count(b'bold') == 1
+
+
+def test_stream():
+    encoder = binary.Encoder()
+    decoder = binary.Decoder()
+    first = encoder.encode(Delta().insert('A', bold=True))
+    second = encoder.encode(Delta().retain(1, bold=None))
+
+    # The second message refers to 'bold' from the first one
+    assert b'bold' not in second
+    assert decoder.decode(first) == Delta().insert('A', bold=True)
+    assert decoder.decode(second) == Delta().retain(1, bold=None)
+
+    with pytest.raises(binary.DecodeError):
+        binary.decode(second)
+
+
+def test_stream_after_error():
+    encoder = binary.Encoder()
+    decoder = binary.Decoder()
+    with pytest.raises(ValueError):
+        encoder.encode(Delta().insert('A', bold=True, color=object()))
+
+    # The failed message's keys aren't referred to later
+    data = encoder.encode(Delta().insert('B', color='red', bold=True))
+    assert decoder.decode(data) == Delta().insert('B', color='red', bold=True)
+    assert decoder.decode(encoder.encode(Delta().retain(1, bold=None))) == Delta().retain(1, bold=None)
+
+    # Same for a message that fails to decode
+    data = encoder.encode(Delta().insert('C', italic=True))
+    with pytest.raises(binary.DecodeError):
+        decoder.decode(data[:-1])
+    assert decoder.keys == ['color', 'bold']
+
+
+def test_decode_from():
+    data = binary.encode(Delta().insert('A')) + binary.encode(Delta().insert('B'))
+    decoder = binary.Decoder()
+    a, pos = decoder.decode_from(data)
+    b, end = decoder.decode_from(data, pos)
+
+    assert (a, b) == (Delta().insert('A'), Delta().insert('B'))
+    assert end == len(data)
+
+
+def test_errors():
+    data = binary.encode(Delta().insert('Hello'))
+
+    with pytest.raises(binary.DecodeError):
+        binary.decode(b'{}')
+    with pytest.raises(binary.DecodeError):
+        binary.decode(data[:-1])
+    with pytest.raises(binary.DecodeError):
+        binary.decode(data + b'\x00')
+    # Every truncation, including one inside the header
+    for end in range(len(data)):
+        with pytest.raises(binary.DecodeError):
+            binary.decode(data[:end])
+    with pytest.raises(binary.DecodeError):
+        binary.Decoder().decode_from(data + b'QD', len(data))
+    with pytest.raises(ValueError):
+        binary.encode([{'bogus': 1}])
+    with pytest.raises(binary.DecodeError):
+        binary.decode(binary.encode(Delta().insert('\xe9')).replace(b'\xc3\xa9', b'\xff\xfe'))
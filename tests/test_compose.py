@@ -155,3 +155,56 @@ def test_immutability():
     assert b1 == b2
     assert attr1 == attr2
 
+
+
+def test_retain_start_optimization():
+    a = Delta().insert('A', bold=True).insert('B').insert('C', bold=True).delete(1)
+    b = Delta().retain(3).insert('D')
+    expected = Delta().insert('A', bold=True).insert('B').insert('C', bold=True).insert('D').delete(1)
+
+    assert a.compose(b) == expected
+
+
+def test_retain_start_optimization_split():
+    a = Delta().insert('A', bold=True).insert('B').insert('C', bold=True).retain(5).delete(1)
+    b = Delta().retain(4).insert('D')
+    expected = Delta().insert('A', bold=True).insert('B').insert('C', bold=True) \
+                      .retain(1).insert('D').retain(4).delete(1)
+
+    assert a.compose(b) == expected
+
+
+def test_retain_end_optimization():
+    a = Delta().insert('A', bold=True).insert('B').insert('C', bold=True)
+    b = Delta().delete(1)
+    expected = Delta().insert('B').insert('C', bold=True)
+
+    assert a.compose(b) == expected
+
+
+def test_retain_end_optimization_join():
+    a = Delta().insert('A', bold=True).insert('B').insert('C', bold=True) \
+               .insert('D').insert('E', bold=True).insert('F')
+    b = Delta().retain(1).delete(1)
+    expected = Delta().insert('AC', bold=True).insert('D').insert('E', bold=True).insert('F')
+
+    assert a.compose(b) == expected
+
+
+def test_optimization_immutability():
+    a = Delta().insert('Hello', bold=True).insert(' World').insert('!', italic=True)
+    original = Delta([dict(o) for o in a.ops])
+    b = Delta().retain(5).insert('X')
+
+    result = a.compose(b)
+    result.insert('Y', bold=True).insert('Z')
+    a.compose(Delta().retain(11).delete(1)).insert('!')
+
+    assert a == original
+
+    # Attribute dicts aren't shared with the prefix or the suffix either
+    document = Delta().insert('Hello', bold=True).insert(' World', italic=True)
+    result = document.compose(Delta().retain(5).insert('!'))
+    result.ops[0]['attributes']['color'] = 'red'
+    result.ops[-1]['attributes']['color'] = 'red'
+    assert document == Delta().insert('Hello', bold=True).insert(' World', italic=True)
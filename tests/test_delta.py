@@ -1,7 +1,7 @@
 
 
 
-from delta.base import Delta
+from delta.base import Delta, DeltaBuilder
 
 
 def test_creation():
@@ -9,4 +9,35 @@ def test_creation():
     d = Delta([])
     d = Delta(d)
 
-    
\ No newline at end of file
+    
+
+def test_builder():
+    builder = DeltaBuilder()
+    for char in 'Hello':
+        builder.insert(char)
+    builder.insert(' World', bold=True).delete(2).insert('!', bold=True).retain(3).retain(2)
+    delta = builder.chop().build()
+
+    assert delta == Delta().insert('Hello').insert(' World!', bold=True).delete(2)
+    assert isinstance(delta, Delta)
+
+
+def test_builder_matches_push():
+    ops = [{'insert': 'a'}, {'delete': 1}, {'insert': 'b'}, {'insert': 'c', 'attributes': {'bold': True}},
+           {'insert': 'd', 'attributes': {'bold': True}}, {'retain': 1}, {'retain': 1}, {'insert': {'image': 'x'}},
+           {'delete': 1}, {'delete': 1}]
+    delta = Delta()
+    builder = DeltaBuilder()
+    for op in ops:
+        delta.push(op)
+        builder.push(op)
+
+    assert builder.build() == delta
+    assert ops[3] == {'insert': 'c', 'attributes': {'bold': True}}
+
+
+def test_builder_last():
+    builder = DeltaBuilder().insert('a').insert('b')
+    assert builder.last() == {'insert': 'ab'}
+    builder.insert('c')
+    assert builder.build() == Delta().insert('abc')
@@ -0,0 +1,126 @@
+import copy
+import gc
+import json
+import pickle
+
+import pytest
+
+from delta import Delta
+from delta.embed import Embed, EmbedTable, intern, freeze
+
+
+def test_intern_shares_equal_payloads():
+    a = intern({'image': 'http://quilljs.com'})
+    b = intern({'image': 'http://quilljs.com'})
+    assert isinstance(a, Embed)
+    assert a is b
+    assert a == {'image': 'http://quilljs.com'}
+    assert hash(a) == hash(b)
+    assert intern(a) is a
+    assert intern('text') == 'text'
+
+
+def test_intern_nested():
+    a = intern({'formula': {'tex': 'x^2', 'args': [1, 2]}})
+    b = intern({'formula': {'args': [1, 2], 'tex': 'x^2'}})
+    c = intern({'formula': {'tex': 'x^2', 'args': [2, 1]}})
+    assert a is b
+    assert a is not c
+    assert a != c
+
+
+def test_immutable():
+    embed = intern({'image': 'a.png'})
+    with pytest.raises(TypeError):
+        embed['image'] = 'b.png'
+    with pytest.raises(TypeError):
+        embed.update(alt='b')
+    with pytest.raises(TypeError):
+        del embed['image']
+    assert embed == {'image': 'a.png'}
+    with pytest.raises(TypeError):
+        embed |= {'alt': 'b'}
+    assert embed == {'image': 'a.png'}
+
+    nested = intern({'formula': {'tex': 'x', 'args': [1]}})
+    with pytest.raises(TypeError):
+        nested['formula']['tex'] = 'y'
+    with pytest.raises(TypeError):
+        nested['formula']['args'].append(2)
+    with pytest.raises(TypeError):
+        nested['formula']['args'][0] = 2
+    assert nested == {'formula': {'tex': 'x', 'args': [1]}}
+
+
+def test_payload_copied():
+    payload = {'formula': {'tex': 'a', 'args': [1]}}
+    delta = Delta().insert(payload)
+    payload['formula']['tex'] = 'b'
+    payload['formula']['args'].append(2)
+    assert delta.ops[0]['insert'] == {'formula': {'tex': 'a', 'args': [1]}}
+
+    # The table isn't poisoned either
+    other = Delta().insert({'formula': {'tex': 'a', 'args': [1]}})
+    assert other.ops[0]['insert'] is delta.ops[0]['insert']
+    assert other.ops[0]['insert'] == {'formula': {'tex': 'a', 'args': [1]}}
+
+
+def test_copy_and_pickle():
+    embed = intern({'image': 'a.png'})
+    assert copy.copy(embed) is embed
+    assert copy.deepcopy(embed) is embed
+    assert copy.deepcopy([{'insert': embed}])[0]['insert'] is embed
+    assert pickle.loads(pickle.dumps(embed)) is embed
+
+    nested = intern({'formula': {'tex': 'x', 'args': [1]}})
+    assert pickle.loads(pickle.dumps(nested)) is nested
+    assert json.loads(json.dumps(nested)) == nested
+
+
+def test_types_kept():
+    assert intern({'video': True}) is not intern({'video': 1})
+    assert type(Delta().insert({'video': 1}).ops[0]['insert']['video']) is int
+    assert type(intern({'video': 1.0})['video']) is float
+    assert freeze(True) != freeze(1)
+
+
+def test_empty_table():
+    table = EmbedTable()
+    embed = intern({'image': 'empty.png'}, table)
+    assert len(table) == 1
+    assert embed in table.embeds.values()
+
+
+def test_table():
+    table = EmbedTable()
+    a = table.intern({'video': 'v.mp4'})
+    assert table.intern({'video': 'v.mp4'}) is a
+    assert intern({'video': 'v.mp4'}, table) is a
+    assert intern({'video': 'v.mp4'}) is not a
+    assert len(table) == 1
+    del a
+    gc.collect()
+    assert len(table) == 0
+
+
+def test_freeze():
+    assert freeze({'a': [1, {'b': 2}]}) == freeze({'a': [1, {'b': 2}]})
+    assert freeze([1]) != freeze(1)
+    hash(freeze({'a': [1, {'b': 2}]}))
+
+
+def test_delta_interns_embeds():
+    a = Delta().insert({'image': 'a.png'}).insert('b')
+    b = Delta.from_ops([{'insert': {'image': 'a.png'}}])
+    assert a.ops[0]['insert'] is b.ops[0]['insert']
+    c = a.compose(Delta().retain(1, bold=True))
+    assert c.ops[0]['insert'] is a.ops[0]['insert']
+    assert c.ops == [{'insert': {'image': 'a.png'}, 'attributes': {'bold': True}}, {'insert': 'b'}]
+
+
+def test_diff_embeds():
+    a = Delta().insert({'image': 'a.png'}).insert('text')
+    b = Delta().insert({'image': 'a.png'}).insert('next')
+    assert a.diff(b) == Delta().retain(1).insert('n').delete(1)
+    c = Delta().insert({'image': 'b.png'}).insert('text')
+    assert a.diff(c) == Delta().insert({'image': 'b.png'}).delete(1)
@@ -168,3 +168,135 @@ def test_length():
     assert len(Delta().insert(1)) == 1
     assert len(Delta().retain(2)) == 2
     assert len(Delta().retain(2).delete(1)) == 3
+
+
+def test_invert():
+    # insert
+    delta = Delta().retain(2).insert('A')
+    base = Delta().insert('123456')
+    expected = Delta().retain(2).delete(1)
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+    # delete
+    delta = Delta().retain(2).delete(3)
+    base = Delta().insert('123456')
+    expected = Delta().retain(2).insert('345')
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+    # retain
+    delta = Delta().retain(2).retain(3, bold=True)
+    base = Delta().insert('123456')
+    expected = Delta().retain(2).retain(3, bold=None)
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+    # retain on a delta with different attributes
+    base = Delta().insert('123').insert('4', bold=True)
+    delta = Delta().retain(4, italic=True)
+    expected = Delta().retain(4, italic=None)
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+    # combined
+    delta = Delta().retain(2) \
+                   .delete(2) \
+                   .insert('AB', italic=True) \
+                   .retain(2, italic=None, bold=True) \
+                   .retain(2, color='red') \
+                   .delete(1)
+    base = Delta().insert('123', bold=True) \
+                  .insert('456', italic=True) \
+                  .insert('789', color='red', bold=True)
+    expected = Delta().retain(2) \
+                      .insert('3', bold=True) \
+                      .insert('4', italic=True) \
+                      .delete(2) \
+                      .retain(2, italic=True, bold=None) \
+                      .retain(2) \
+                      .insert('9', color='red', bold=True)
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+    # retain spanning several base ops
+    base = Delta().insert('ab').insert('c', bold=True).insert('d', italic=True)
+    delta = Delta().retain(3).delete(1)
+    expected = Delta().retain(3).insert('d', italic=True)
+    inverted = delta.invert(base)
+    assert inverted == expected
+    assert base.compose(delta).compose(inverted) == base
+
+
+def test_invert_random():
+    import random
+    rng = random.Random(0)
+    formats = [{}, {'bold': True}, {'italic': True}, {'color': 'red', 'bold': True}]
+    for i in range(500):
+        base = Delta()
+        for j in range(rng.randint(1, 8)):
+            base.insert('xyz'[:rng.randint(1, 3)], **rng.choice(formats))
+        change = Delta()
+        remaining = len(base)
+        while remaining > 0:
+            length = rng.randint(1, remaining)
+            kind = rng.choice(['retain', 'format', 'delete', 'insert'])
+            if kind == 'insert':
+                change.insert('new', **rng.choice(formats))
+                continue
+            if kind == 'retain':
+                change.retain(length)
+            elif kind == 'format':
+                change.retain(length, **rng.choice(formats[1:] + [{'bold': None}]))
+            else:
+                change.delete(length)
+            remaining -= length
+        assert base.compose(change).compose(change.invert(base)) == base, (base, change)
+
+
+def test_from_ops():
+    ops = [
+        {'insert': 'Hel'},
+        {'insert': ''},
+        {'insert': 'lo', 'attributes': {}},
+        {'insert': ' ', 'attributes': {'bold': True}},
+        {'insert': 'World', 'attributes': {'bold': True}},
+        {'retain': 0},
+        {'delete': 1},
+        {'delete': 2},
+        {'insert': '!'},
+        {'retain': 2, 'attributes': {'color': 'red'}},
+        {'retain': 3, 'attributes': {'color': 'red'}},
+        {'insert': {'image': 'octocat.png'}},
+        {'insert': {'image': 'octocat.png'}},
+        {'delete': 1},
+        {'insert': 'a'},
+        {'insert': 'b'},
+    ]
+    delta = Delta.from_ops(ops)
+
+    assert delta == Delta().insert('Hello').insert(' World', bold=True).insert('!').delete(3) \
+                           .retain(5, color='red').insert({'image': 'octocat.png'}) \
+                           .insert({'image': 'octocat.png'}).insert('ab').delete(1)
+
+    # Input is left alone
+    assert ops[0] == {'insert': 'Hel'}
+    assert ops[6] == {'delete': 1}
+    assert ops[9] == {'retain': 2, 'attributes': {'color': 'red'}}
+
+    # Same as pushing one by one
+    ops = [{'insert': 'A'}, {'delete': 1}, {'insert': 'B', 'attributes': {'bold': True}}, {'delete': 1},
+           {'insert': 'C', 'attributes': {'bold': True}}, {'retain': 1}, {'retain': 2}]
+    expected = Delta()
+    for op in ops:
+        expected.push(op)
+    assert Delta.from_ops(ops) == expected
+
+    assert Delta.from_ops([{'delete': 1}, {'insert': 'A'}]) == Delta().insert('A').delete(1)
+    assert Delta.from_ops(Delta().insert('A')) == Delta().insert('A')
+    assert Delta.from_ops([]) == Delta()
@@ -0,0 +1,104 @@
+import pytest
+from delta import Delta
+from delta.history import History, Compactor
+
+
+def build_history():
+    history = History(Delta().insert('Hello'))
+    history.apply(Delta().retain(5).insert(' World'), timestamp=10)
+    history.apply(Delta().retain(11).insert('!'), timestamp=20)
+    history.apply(Delta().delete(1).insert('J'), timestamp=30)
+    return history
+
+
+def test_apply():
+    history = build_history()
+
+    assert history.revision == 3
+    assert history.document() == Delta().insert('Jello World!')
+    assert history.since(2) == [Delta().delete(1).insert('J')]
+
+
+def test_compact_keep():
+    history = build_history()
+    expected = history.document()
+
+    assert history.compact(keep=1) == 2
+    assert history.base == 2
+    assert history.revision == 3
+    assert history.checkpoint == Delta().insert('Hello World!')
+    assert history.document() == expected
+
+    with pytest.raises(ValueError):
+        history.since(1)
+    assert len(history.since(2)) == 1
+
+
+def test_compact_max_age():
+    history = build_history()
+
+    assert history.compactable(max_age=15, now=40) == 2
+    assert history.compact(max_age=15, now=40) == 2
+    assert history.compact(max_age=15, now=40) == 0
+    assert history.document() == Delta().insert('Jello World!')
+
+
+def test_compactor():
+    history = build_history()
+    compactor = Compactor(keep=0)
+    compactor.register(history)
+    compactor.run_once()
+
+    metrics = compactor.metrics()
+    assert metrics['runs'] == 1
+    assert metrics['compacted'] == 3
+    assert metrics['pending'] == 0
+    assert len(history) == 0
+    assert history.checkpoint == Delta().insert('Jello World!')
+
+
+def test_compactor_thread():
+    history = build_history()
+    compactor = Compactor(interval=0.01, keep=0)
+    compactor.register(history)
+    compactor.start()
+    try:
+        for _ in range(200):
+            if compactor.runs:
+                break
+            compactor._stopped.wait(0.01)
+    finally:
+        compactor.stop(1)
+
+    assert compactor.compacted == 3
+    assert history.document() == Delta().insert('Jello World!')
+
+
+def test_overlapping_compactions():
+    import threading
+
+    entered = threading.Event()
+    release = threading.Event()
+
+    class SlowDelta(Delta):
+        def compose(self, other):
+            entered.set()
+            release.wait(5)
+            return Delta(self.ops).compose(other)
+
+    history = History()
+    history.checkpoint = SlowDelta().insert('a')
+    for i in range(4):
+        history.apply(Delta().retain(1 + i).insert(str(i)))
+
+    first = threading.Thread(target=history.compact)
+    first.start()
+    entered.wait(5)
+    second = threading.Thread(target=history.compact, kwargs={'keep': 2})
+    second.start()
+    release.set()
+    first.join(5)
+    second.join(5)
+
+    assert history.document() == Delta().insert('a0123')
+    assert history.revision == 4
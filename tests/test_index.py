@@ -0,0 +1,277 @@
+import random
+import re
+import pytest
+from delta import Delta
+from delta.index import OffsetIndex, AttributeIndex, LineIndex
+
+
+def make_document():
+    return Delta().insert('Hello ', bold=True) \
+                  .insert('World', bold=True, italic=True) \
+                  .insert({'image': 'octocat.png'}) \
+                  .insert('\nhello again\n')
+
+
+def test_offset_index():
+    index = OffsetIndex(make_document().ops)
+
+    assert len(index) == 25
+    assert index.starts == [0, 6, 11, 12]
+    assert index.text == 'Hello World\0\nhello again\n'
+    assert index.find(0) == 0
+    assert index.find(6) == 1
+    assert index.find(11) == 2
+    assert index.find(24) == 3
+    assert index.find(25) is None
+    assert list(index.span(4, 12)) == [0, 1, 2]
+    assert list(index.span(6, 11)) == [1]
+    assert index.attributes_at(7) == {'bold': True, 'italic': True}
+    assert index.attributes_between(0, 11) == {'bold': True}
+
+    with pytest.raises(ValueError):
+        OffsetIndex(Delta().retain(1).ops)
+
+
+def test_search():
+    document = make_document()
+
+    matches = document.search('ello')
+    assert [(m.start, m.end) for m in matches] == [(1, 5), (14, 18)]
+    assert matches[0].attributes == {'bold': True}
+    assert matches[1].attributes == {}
+
+    matches = document.search(r'o W\w+', regex=True)
+    assert matches == [(4, 11, 'o World', {'bold': True})]
+
+    matches = document.search('hello', flags=re.IGNORECASE)
+    assert [m.start for m in matches] == [0, 13]
+
+    assert document.search('missing') == []
+
+
+def test_cached_index():
+    document = make_document()
+    index = document.offset_index()
+
+    assert document.offset_index() is index
+
+    document.insert('more')
+    assert document.offset_index() is not index
+    assert document.search('more')[0].start == 25
+
+    document.ops.append({'insert': '!'})
+    assert document.offset_index().text.endswith('more!')
+
+    # Deltas built from another share its ops, and push merges into the last one
+    Delta(document).insert('c')
+    assert document.search('c')[0].start == 30
+    Delta(document).insert('d', bold=True)
+    assert document.search('d')[-1] == (31, 32, 'd', {'bold': True})
+    document.ops[-1]['attributes'] = {'italic': True}
+    assert document.get_format(31, 1).common == {'italic': True}
+
+
+def test_attribute_index():
+    document = Delta().insert('Visit ') \
+                      .insert('Quill', link='https://quilljs.com', bold=True) \
+                      .insert(' and ', bold=True) \
+                      .insert('GitHub', link='https://github.com') \
+                      .insert('\n', header=1)
+    index = AttributeIndex(document)
+
+    assert index.names() == ['bold', 'header', 'link']
+    assert index.ranges('link') == [(6, 11, 'https://quilljs.com'), (16, 22, 'https://github.com')]
+    assert index.ranges('link', 'https://github.com') == [(16, 22, 'https://github.com')]
+    assert index.ranges('bold') == [(6, 16, True)]
+    assert index.ranges('italic') == []
+    assert index.formats_at(7) == {'bold': True, 'link': 'https://quilljs.com'}
+    assert index.formats_at(0) == {}
+    assert index.formats_at(22) == {'header': 1}
+
+
+def test_attribute_index_apply():
+    document = Delta().insert('abc', bold=True).insert('def').insert('ghi', bold=True).insert('\n')
+    index = AttributeIndex(document)
+
+    # Formatting the gap joins both runs
+    index.apply(Delta().retain(3).retain(3, bold=True))
+    assert index.ranges('bold') == [(0, 9, True)]
+
+    # Inserting plain text splits it, the rest moves
+    index.apply(Delta().retain(4).insert('XY'))
+    assert index.ranges('bold') == [(0, 4, True), (6, 11, True)]
+
+    # Deleting across the boundary
+    index.apply(Delta().retain(2).delete(6).retain(1, italic=True))
+    assert index.ranges('bold') == [(0, 5, True)]
+    assert index.ranges('italic') == [(2, 3, True)]
+    assert index.document == Delta().insert('ab', bold=True).insert('g', bold=True, italic=True) \
+                                    .insert('hi', bold=True).insert('\n')
+
+
+def test_attribute_index_apply_skips_untouched(monkeypatch):
+    from delta import index as module
+    document = Delta().insert('ab', link='x').insert('cd').insert('ef', bold=True).insert('\n')
+    index = AttributeIndex(document)
+    merged = []
+    merge_runs = module.merge_runs
+    def spy(runs, lo, hi):
+        merged.append(runs[0][2] if runs else None)
+        return merge_runs(runs, lo, hi)
+    monkeypatch.setattr(module, 'merge_runs', spy)
+
+    # Formatting elsewhere leaves the link runs alone
+    index.apply(Delta().retain(4).retain(1, italic=True))
+    assert sorted(merged) == [True, True]
+    assert index.ranges('link') == [(0, 2, 'x')]
+
+    # Inserting shifts only what follows
+    index.apply(Delta().retain(3).insert('Z'))
+    assert index.ranges('link') == [(0, 2, 'x')]
+    assert index.ranges('bold') == [(5, 7, True)]
+    assert index.ranges('italic') == [(5, 6, True)]
+
+
+def test_attribute_index_matches_rebuild():
+    rng = random.Random(3)
+    document = Delta().insert('\n')
+    index = AttributeIndex(document)
+    for _ in range(300):
+        length = len(index.document)
+        position = rng.randint(0, length - 1)
+        span = rng.randint(0, length - 1 - position)
+        change = Delta().retain(position)
+        kind = rng.random()
+        if kind < 0.4:
+            change.insert('x' * rng.randint(1, 5), **rng.choice([{}, {'bold': True}, {'link': 'a'}]))
+        elif kind < 0.6:
+            change.delete(span)
+        else:
+            change.retain(span, **rng.choice([{'bold': True}, {'bold': None}, {'link': 'b'}, {'link': None}]))
+        index.apply(change)
+
+        expected = AttributeIndex(index.document)
+        assert index.runs == expected.runs
+
+
+def test_get_format():
+    document = Delta().insert('Hello ', bold=True) \
+                      .insert('World', bold=True, color='red') \
+                      .insert('\n', header=1) \
+                      .insert('Plain ', color='blue') \
+                      .insert('text') \
+                      .insert('\n', header=1, align='center')
+
+    assert document.get_format(0, 5) == ({'bold': True}, {}, {'header': 1})
+    assert document.get_format(3, 6) == ({'bold': True}, {'color': ['red']}, {'header': 1})
+
+    # Across lines: the newline's own formats don't count as inline
+    formats = document.get_format(8, 8)
+    assert formats.common == {}
+    assert formats.partial == {'bold': [True], 'color': ['red', 'blue']}
+    assert formats.line == {'header': 1}
+
+    # Cursor: formats of the previous character
+    assert document.get_format(8) == ({'bold': True, 'color': 'red'}, {}, {'header': 1})
+    assert document.get_format(0) == ({'bold': True}, {}, {'header': 1})
+    assert document.get_format(15).line == {'header': 1, 'align': 'center'}
+    # Start of a line: the previous newline's line formats aren't inline
+    assert document.get_format(12) == ({'color': 'blue'}, {}, {'header': 1, 'align': 'center'})
+
+    document = Delta().insert('Title').insert('\n', header=1).insert('body\n')
+    assert document.get_format(6) == ({}, {}, {})
+    assert Delta().insert('a\n', bold=True).insert('\n', header=2).get_format(2).common == {}
+
+    assert Delta().insert('no newline').get_format(2).line == {}
+
+
+def test_line_index():
+    document = Delta().insert('Hello\n\n') \
+                      .insert('World', bold=True) \
+                      .insert({'image': 'octocat.png'}) \
+                      .insert('\n', align='right') \
+                      .insert('!')
+    index = LineIndex(document)
+
+    assert len(index) == 4 == len(list(document.iter_lines()))
+    assert [index.offset_of(i) for i in range(4)] == [0, 6, 7, 14]
+    assert [index.attributes(i) for i in range(4)] == [{}, {}, {'align': 'right'}, {}]
+    assert index.line_range(2) == (7, 13)
+    assert index.line_range(3) == (14, 15)
+    assert index.line_of(0) == 0
+    assert index.line_of(5) == 0
+    assert index.line_of(6) == 1
+    assert index.line_of(12) == 2
+    assert index.line_of(14) == 3
+
+    with pytest.raises(IndexError):
+        index.line_of(15)
+    with pytest.raises(IndexError):
+        index.offset_of(4)
+
+
+def test_line_index_apply():
+    index = LineIndex(Delta().insert('one\ntwo\n', header=1).insert('three\n'))
+
+    index.apply(Delta().retain(4).insert('1.5\n', header=2))
+    assert len(index) == 4
+    assert index.offset_of(2) == 8
+    assert index.attributes(1) == {'header': 2}
+    assert index.attributes(2) == {'header': 1}
+
+    index.apply(Delta().retain(2).delete(4))
+    assert index.document == Delta().insert('on', header=1).insert('5\n', header=2) \
+                                    .insert('two\n', header=1).insert('three\n')
+    assert [index.offset_of(i) for i in range(len(index))] == [0, 4, 8]
+    assert index.attributes(0) == {'header': 2}
+
+
+def test_line_index_matches_rebuild():
+    rng = random.Random(5)
+    index = LineIndex(Delta().insert('\n'))
+    for _ in range(300):
+        length = len(index.document)
+        position = rng.randint(0, length - 1)
+        span = rng.randint(0, length - 1 - position)
+        change = Delta().retain(position)
+        kind = rng.random()
+        if kind < 0.4:
+            change.insert(rng.choice(['x', 'xy\n', '\n', 'a\nb']), **rng.choice([{}, {'header': 1}]))
+        elif kind < 0.6:
+            change.delete(span)
+        else:
+            change.retain(span, **rng.choice([{'bold': True}, {'align': 'center'}, {'align': None}]))
+        index.apply(change)
+
+        expected = LineIndex(index.document)
+        assert (index.ends, index.formats, index.length) == (expected.ends, expected.formats, expected.length)
+
+
+def test_indexes_compound_changes():
+    rng = random.Random(11)
+    document = Delta().insert('ab\ncd', bold=True).insert('\n', header=1).insert('ef\n')
+    lines = LineIndex(document)
+    attributes = AttributeIndex(document)
+    for _ in range(300):
+        length = lines.length
+        change = Delta()
+        position = 0
+        while position < length - 1 and rng.random() < 0.8:
+            step = rng.randint(0, min(4, length - 1 - position))
+            kind = rng.random()
+            if kind < 0.3:
+                change.retain(step)
+            elif kind < 0.5:
+                change.insert(rng.choice(['x', 'y\n', '\n']), **rng.choice([{}, {'bold': True}, {'header': 2}]))
+                continue
+            elif kind < 0.7:
+                change.delete(step)
+            else:
+                change.retain(step, **rng.choice([{'bold': None}, {'italic': True}, {'header': 1}]))
+            position += step
+        lines.apply(change)
+        attributes.apply(change)
+
+        expected = LineIndex(lines.document)
+        assert (lines.ends, lines.formats, lines.length) == (expected.ends, expected.formats, expected.length)
+        assert attributes.runs == AttributeIndex(attributes.document).runs
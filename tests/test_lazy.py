@@ -0,0 +1,86 @@
+import json
+import pytest
+from delta import Delta
+from delta.lazy import LazyDelta, LazyOps
+
+
+def make_raw(lines=100):
+    delta = Delta()
+    for i in range(lines):
+        delta.insert('Line %d' % i, **({'bold': True} if i % 2 else {})).insert('\n')
+    return delta, json.dumps({'ops': delta.ops}).encode('utf-8')
+
+
+def test_lazy_ops():
+    ops = LazyOps(b' [ {"insert": "a"} , {"insert": "b", "attributes": {"bold": true}} ] ')
+
+    assert ops.decoded == 0
+    assert ops[0] == {'insert': 'a'}
+    assert ops.decoded == 1
+    assert list(ops) == [{'insert': 'a'}, {'insert': 'b', 'attributes': {'bold': True}}]
+    with pytest.raises(IndexError):
+        ops[2]
+
+    assert not LazyOps('{"ops": []}')
+    with pytest.raises(ValueError):
+        LazyOps('{"other": []}')
+    with pytest.raises(ValueError):
+        LazyOps('[{"insert": "a"} {"insert": "b"}]')[1]
+
+
+def test_partial_reads():
+    expected, raw = make_raw()
+    delta = LazyDelta(raw)
+
+    assert delta[:6] == Delta().insert('Line 0')
+    lines = delta.iter_lines()
+    assert next(lines) == (Delta().insert('Line 0'), {}, 0)
+    assert next(lines) == (Delta().insert('Line 1', bold=True), {}, 1)
+    assert delta.ops.decoded < 10
+    assert delta.lazy
+
+    assert len(delta) == len(expected)
+    assert delta == expected
+
+
+def test_compose():
+    expected, raw = make_raw(3)
+    change = Delta().retain(6).insert('!')
+
+    assert LazyDelta(raw).compose(change) == expected.compose(change)
+    assert expected.compose(LazyDelta(json.dumps(change.ops))) == expected.compose(change)
+
+
+def test_materialize_on_change():
+    expected, raw = make_raw(3)
+    delta = LazyDelta(raw)
+    delta.insert('more')
+
+    assert not delta.lazy
+    assert delta == expected.insert('more')
+
+
+
+def test_concat():
+    delta, raw = make_raw(3)
+    result = LazyDelta(raw).concat(Delta().insert('end'))
+    assert result == delta.concat(Delta().insert('end'))
+
+
+def test_deepcopy():
+    import copy
+    delta, raw = make_raw(3)
+    lazy = LazyDelta(raw)
+    copied = copy.deepcopy(lazy)
+    assert copied.lazy
+    assert copied == delta
+    assert copy.deepcopy(LazyOps(raw)) == delta.ops
+
+
+def test_pickle():
+    import pickle
+    delta, raw = make_raw(3)
+    restored = pickle.loads(pickle.dumps(LazyDelta(raw)))
+    assert restored.lazy
+    assert restored == delta
+    assert pickle.loads(pickle.dumps(LazyOps(raw))) == delta.ops
@@ -0,0 +1,91 @@
+import gc
+import sys
+
+from delta import Delta, memory
+from delta.lazy import LazyDelta
+from delta.memory import Usage, sizeof, track, untrack, summary, deep_size
+
+
+def test_sizeof():
+    text = 'x' * 1000
+    delta = Delta().insert(text).insert('abc', bold=True, link='http://example.com')
+    usage = sizeof(delta)
+
+    assert isinstance(usage, Usage)
+    assert usage.strings >= sys.getsizeof(text)
+    assert usage.attributes >= sys.getsizeof('http://example.com')
+    assert usage.ops >= sys.getsizeof(delta.ops) + 2 * sys.getsizeof({})
+    assert usage.embeds == usage.index == usage.shared == 0
+    assert usage.total == sum(usage[:5])
+    assert sizeof(Delta().insert('y' * 2000)).total > usage.total
+
+
+def test_shared_objects():
+    attributes = {'bold': True}
+    op = {'insert': 'x' * 100, 'attributes': attributes}
+    once = sizeof(Delta([op]))
+    assert sizeof(Delta([op, op])) == once._replace(ops=once.ops + 8)
+    assert sizeof(Delta([op]), seen={id(op), id(attributes)}).strings == 0
+
+
+def test_embeds():
+    shared = Delta().insert({'image': 'a.png'})
+    assert shared.ops[0]['insert'].__class__.__name__ == 'Embed'
+    usage = sizeof(shared)
+    assert usage.shared > 0 and usage.embeds == 0
+
+    unique = Delta([{'insert': {'image': 'a.png'}}])
+    usage = sizeof(unique)
+    assert usage.embeds > 0 and usage.shared == 0
+
+
+def test_index():
+    delta = Delta().insert('abc\ndef\n')
+    assert sizeof(delta).index == 0
+    delta.offset_index()
+    assert sizeof(delta).index > 0
+
+
+def test_lazy():
+    raw = '[{"insert": "%s"}, {"insert": "b"}]' % ('a' * 500)
+    delta = LazyDelta(raw)
+    # the constructor decodes the first op
+    assert delta.ops.decoded == 1
+    assert sizeof(delta).strings == sys.getsizeof(raw) + sys.getsizeof('a' * 500)
+    delta.materialize()
+    assert sizeof(delta).strings == sys.getsizeof('a' * 500) + sys.getsizeof('b')
+
+
+def test_deep_size():
+    seen = set()
+    value = {'a': ['x' * 100, {'b': 1.5}]}
+    assert deep_size(value, seen) > sys.getsizeof('x' * 100)
+    assert deep_size(value, seen) == 0
+    assert deep_size(None, set()) == deep_size(True, set()) == 0
+
+
+def test_registry():
+    class Holder(object):
+        def __init__(self, document):
+            self.document = document
+
+    memory.tracked.clear()
+    small = track(Delta().insert('a' * 1000), 'small')
+    big = track(Holder(Delta().insert('b' * 10000)), 'big')
+    shared = Delta().insert({'image': 'a.png'})
+    track(shared)
+    copied = track(Delta([shared.ops[0]]).insert('c'), 'copy')
+
+    result = summary()
+    assert result['documents'] == 4
+    assert [name for name, size in result['largest'][:2]] == ['big', 'small']
+    assert result['total'] == result['usage'].total + result['usage'].shared
+    # the embed and its op are counted once
+    assert result['usage'].shared == sizeof(shared).shared
+
+    untrack(small)
+    del big
+    gc.collect()
+    assert sorted(str(name) for name, delta in memory.documents()) == sorted([str(id(shared)), 'copy'])
+    assert ('copy', copied) in memory.documents()
+    memory.tracked.clear()
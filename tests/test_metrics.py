@@ -0,0 +1,60 @@
+import pytest
+from delta import Delta
+from delta import html, metrics
+
+
+@pytest.fixture
+def recording():
+    metrics.reset()
+    metrics.enable()
+    yield metrics
+    metrics.disable()
+    metrics.reset()
+
+
+def test_disabled():
+    metrics.reset()
+    Delta().insert('AB').compose(Delta().retain(1).insert('C'))
+    assert metrics.snapshot() == {}
+
+
+def test_counters(recording):
+    a = Delta().insert('Hello', bold=True).insert(' World')
+    b = Delta().retain(2).insert('!').delete(1)
+    a.compose(b)
+    b.transform(Delta().retain(8).insert('?'), True)
+    Delta().insert('A').insert('B')
+
+    values = metrics.snapshot()
+    assert values['compose.calls'] == 1
+    assert values['compose.ops'] == 5
+    assert values['transform.calls'] == 1
+    assert values['iterator.splits'] >= 1
+    assert values['push.merges'] >= 1
+
+
+def test_diff(recording):
+    Delta().insert('Hello').diff(Delta().insert('Help'))
+    assert metrics.snapshot()['diff.calls'] == 1
+
+
+def test_render(recording):
+    html.render(Delta().insert('Hello', bold=True).insert('\n', header=1))
+
+    values = metrics.snapshot()
+    assert values['render.calls'] == 1
+    assert values['render.seconds'] > 0
+    assert 'render.format.bold.seconds' in values
+    assert 'render.format.header.seconds' in values
+
+
+def test_subscribe(recording):
+    seen = []
+    listener = metrics.subscribe(lambda name, value: seen.append((name, value)))
+    try:
+        Delta().insert('A').compose(Delta().delete(1))
+    finally:
+        metrics.unsubscribe(listener)
+
+    assert ('compose.calls', 1) in seen
+    assert ('compose.ops', 2) in seen
@@ -137,4 +137,39 @@ def test_next():
     iterator.next(1)
     assert iterator.index == 1
     assert iterator.peek() == ops[1]
-    
\ No newline at end of file
+    
+
+def test_invert():
+    assert op.invert(None, None) is None
+    assert op.invert({'bold': True}, None) == {'bold': None}
+    assert op.invert({'bold': None}, {'bold': True}) == {'bold': True}
+    assert op.invert({'bold': True}, {'bold': True}) is None
+    assert op.invert({'color': 'red', 'italic': None, 'size': '12px'},
+                     {'bold': True, 'color': 'blue', 'italic': True}) == {'color': 'blue', 'italic': True, 'size': None}
+
+
+def test_take():
+    ops = [
+        {'insert': 'Hello', 'attributes': {'bold': True}},
+        {'retain': 3},
+        {'insert': {'image': 'octocat.png'}},
+        {'delete': 4},
+    ]
+
+    iterator = op.iterator(ops)
+    assert iterator.take(2) == ('insert', 2, {'bold': True}, 'Hello', 0)
+    assert iterator.take() == ('insert', 3, {'bold': True}, 'Hello', 2)
+    assert iterator.take(5) == ('retain', 3, None, None, 0)
+    assert iterator.take() == ('insert', 1, None, {'image': 'octocat.png'}, 0)
+    assert iterator.take(1) == ('delete', 1, None, None, 0)
+    assert iterator.peek_length() == 3
+    assert iterator.take() == ('delete', 3, None, None, 0)
+    assert iterator.take() == ('retain', None, None, None, 0)
+    assert iterator.has_next() is False
+
+
+def test_make():
+    assert op.make('insert', 2, {'bold': True}, 'Hello', 2) == {'insert': 'll', 'attributes': {'bold': True}}
+    assert op.make('insert', 1, None, {'image': 'a.png'}) == {'insert': {'image': 'a.png'}}
+    assert op.make('retain', 3, {}, None) == {'retain': 3}
+    assert op.make('delete', 3, None, None) == {'delete': 3}
@@ -0,0 +1,118 @@
+import io
+
+from lxml import etree
+
+from delta import html
+from delta.base import Delta
+from delta.parse import parse, parse_file, parse_many, parse_files, Importer, Parser, parser
+
+
+def roundtrip(ops):
+    assert parse(html.render(ops)) == Delta(ops)
+
+
+def test_basics():
+    roundtrip([
+        {"insert": "Quill\nEditor\n\n"},
+        {"insert": "bold", "attributes": {"bold": True}},
+        {"insert": " and the "},
+        {"insert": "italic", "attributes": {"italic": True}},
+        {"insert": "\n\nNormal\n"},
+    ])
+
+
+def test_inline():
+    roundtrip([
+        {"insert": "a", "attributes": {"underline": True, "strike": True}},
+        {"insert": "b", "attributes": {"script": "super"}},
+        {"insert": "c", "attributes": {"background": "#000", "color": "#FFF"}},
+        {"insert": "d", "attributes": {"font": "serif", "size": "large"}},
+        {"insert": "e", "attributes": {"link": "http://example.com"}},
+        {"insert": "\n"},
+    ])
+
+
+def test_embeds():
+    roundtrip([
+        {"insert": {"video": "https://www.youtube.com/embed/NAb9V08zcBE"}, "attributes": {"align": "right"}},
+        {"insert": "\n"},
+        {"insert": {"image": "https://i.imgur.com/ZMSUFEU.gif"}, "attributes": {"width": "196", "height": "200"}},
+        {"insert": "\n"},
+    ])
+
+
+def test_blocks():
+    roundtrip([
+        {"insert": "Title"},
+        {"insert": "\n", "attributes": {"header": 1}},
+        {"insert": "item 1"},
+        {"insert": "\n", "attributes": {"list": "ordered", "indent": 1}},
+        {"insert": "item 2"},
+        {"insert": "\n", "attributes": {"list": "bullet"}},
+        {"insert": "Quote"},
+        {"insert": "\n", "attributes": {"blockquote": True}},
+        {"insert": "quill"},
+        {"insert": "\n", "attributes": {"align": "center", "direction": "rtl", "indent": 3}},
+    ])
+
+
+def test_legacy_html():
+    source = (
+        '<html><head><title>t</title><style>p {}</style></head><body>'
+        'loose <b>text</b>'
+        '<div><p>a  <br>\n b</p>tail<ul><li>1<ul><li>2</li></ul></li></ul></div>'
+        '<pre>x\n  y\n</pre><!-- comment -->end&nbsp;</body></html>'
+    )
+    bullet = {'list': 'bullet'}
+    code = {'code-block': True}
+    assert parse(source) == Delta().insert('loose ').insert('text', bold=True) \
+        .insert('\na\nb\ntail\n1').insert('\n', **bullet) \
+        .insert('2').insert('\n', indent=1, **bullet) \
+        .insert('x').insert('\n', **code).insert('  y').insert('\n', **code) \
+        .insert('end\xa0\n')
+
+
+def test_empty():
+    assert parse('<p><br></p>') == Delta().insert('\n')
+    assert parse('<ul></ul>   ') == Delta()
+
+
+def test_registry():
+    @parser('mark')
+    def mark(element):
+        return element.attrib.get('data-mark') if element.tag == 'mark' else None
+    try:
+        assert parse('<p><mark data-mark="x">a</mark></p>') == Delta().insert('a', mark='x').insert('\n')
+    finally:
+        Parser.all.remove(mark)
+
+
+def test_bounded():
+    source = b''.join(b'<p>line %d <b>bold</b></p>' % i for i in range(2000))
+    importer = Importer()
+    kept = 0
+    for event, element in etree.iterparse(io.BytesIO(source), events=('start', 'end'), html=True):
+        if event == 'start':
+            importer.start(element)
+        else:
+            importer.end(element)
+            if element.tag == 'p':
+                # earlier blocks are gone, this one is empty
+                kept += len(list(element.itersiblings(preceding=True))) + len(element)
+    assert kept == 0
+    delta = importer.delta()
+    assert len(list(delta.iter_lines())) == 2000
+
+
+def test_many(tmpdir):
+    sources = ['<p>%d</p>' % i for i in range(4)]
+    expected = [Delta().insert('%d\n' % i) for i in range(4)]
+    assert parse_many(sources, workers=1) == expected
+    assert parse_many(sources, workers=2) == expected
+    paths = []
+    for i, source in enumerate(sources):
+        path = tmpdir.join('%d.html' % i)
+        path.write(source)
+        paths.append(str(path))
+    assert parse_file(paths[0]) == expected[0]
+    assert parse_files(paths, workers=2) == expected
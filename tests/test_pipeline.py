@@ -0,0 +1,60 @@
+from delta import html, pipeline
+from delta.base import Delta
+from delta.pipeline import Pipeline, HtmlSink, TextSink, TokenSink, StatsSink, Sink, Token, Link
+
+
+def document():
+    return Delta().insert('Quill Editor').insert('\n', header=1) \
+        .insert('see ').insert('the ', link='http://quilljs.com') \
+        .insert('docs', link='http://quilljs.com', bold=True).insert(' now\n') \
+        .insert({'image': 'a.png'}).insert('\n') \
+        .insert('one', list='bullet').insert('\n', list='bullet')
+
+
+def test_run():
+    doc = document()
+    result = pipeline.run(doc, html=HtmlSink(), text=TextSink(), tokens=TokenSink(), stats=StatsSink())
+
+    assert result['html'] == html.render(doc)
+    assert result['text'] == doc.document()
+    assert result['tokens'][:3] == [Token('Quill', 0, 0), Token('Editor', 6, 0), Token('see', 13, 1)]
+    assert [t.text for t in result['tokens']] == ['Quill', 'Editor', 'see', 'the', 'docs', 'now', 'one']
+    for token in result['tokens']:
+        assert doc.document()[token.offset:token.offset + len(token.text)] == token.text
+
+    stats = result['stats']
+    assert stats['lines'] == 4
+    assert stats['length'] == len(doc)
+    assert stats['words'] == 7
+    assert stats['characters'] == len(doc) - 1 - 4
+    assert stats['embeds'] == {'image': 1}
+    assert stats['links'] == [Link('http://quilljs.com', 'the docs', 17)]
+
+
+def test_unterminated():
+    doc = Delta().insert('a\nb')
+    assert pipeline.run(doc, text=TextSink()) == {'text': 'a\nb'}
+    assert pipeline.run(Delta(), text=TextSink(), stats=StatsSink())['stats']['lines'] == 0
+
+
+def test_single_pass():
+    class Counter(Sink):
+        def start(self):
+            self.lines = []
+
+        def line(self, line):
+            self.lines.append((line.index, line.offset, line.text, line.newline))
+
+        def finish(self):
+            return self.lines
+
+    runs = []
+    doc = Delta().insert('ab\n').insert({'image': 'a.png'}).insert('c\n')
+    original = doc.iter_lines
+    doc.iter_lines = lambda *a: runs.append(1) or original(*a)
+
+    p = Pipeline(lines=Counter(), text=TextSink())
+    assert p.run(doc)['lines'] == [(0, 0, 'ab', True), (1, 3, '\x00c', True)]
+    assert runs == [1]
+    # sinks are reset between runs
+    assert p.run(doc)['text'] == 'ab\n\x00c\n'
@@ -0,0 +1,135 @@
+import asyncio
+import pytest
+from delta import Delta
+from delta.session import Engine, LocalTransport, Session
+
+
+def run(coro):
+    return asyncio.get_event_loop_policy().new_event_loop().run_until_complete(coro)
+
+
+def test_submit_in_order():
+    async def main():
+        session = Session('doc')
+        session.start()
+        assert await session.submit('a', 0, Delta().insert('Hello')) == (1, Delta().insert('Hello'))
+        assert await session.submit('a', 1, Delta().retain(5).insert('!')) == (2, Delta().retain(5).insert('!'))
+        await session.stop()
+        return session
+
+    session = run(main())
+    assert session.document == Delta().insert('Hello!')
+    assert session.revision == 2
+
+
+def test_concurrent_edits():
+    async def main():
+        transport = LocalTransport()
+        engine = Engine(transport)
+        inbox_a = transport.connect('doc', 'a')
+        inbox_b = transport.connect('doc', 'b')
+        await engine.submit('doc', 'a', 0, Delta().insert('ac'))
+
+        # Both clients edit revision 1 concurrently
+        results = await asyncio.gather(
+            engine.submit('doc', 'a', 1, Delta().retain(1).insert('b')),
+            engine.submit('doc', 'b', 1, Delta().retain(2).insert('d')),
+            engine.submit('doc', 'b', 1, Delta().insert('_')),
+        )
+        document = engine.session('doc').document
+        await engine.close()
+        return results, document, inbox_a, inbox_b
+
+    results, document, inbox_a, inbox_b = run(main())
+    assert document == Delta().insert('_abcd')
+    assert [r[0] for r in results] == [2, 3, 4]
+    assert results[1][1] == Delta().retain(3).insert('d')
+    assert results[2][1] == Delta().insert('_')
+
+    assert inbox_a.qsize() == 2
+    assert inbox_b.qsize() == 2
+    assert inbox_a.get_nowait() == ('doc', 'b', 3, Delta().retain(3).insert('d'))
+
+
+def test_revision_ahead():
+    async def main():
+        engine = Engine()
+        try:
+            with pytest.raises(ValueError):
+                await engine.submit('doc', 'a', 5, Delta().insert('A'))
+        finally:
+            await engine.close()
+
+    run(main())
+
+
+def test_backpressure():
+    async def main():
+        session = Session('doc', maxsize=1)
+        first = asyncio.ensure_future(session.submit('a', 0, Delta().insert('A')))
+        second = asyncio.ensure_future(session.submit('a', 0, Delta().insert('B')))
+        await asyncio.sleep(0)
+        # Worker isn't running: the second submit waits for queue space
+        assert session.queue.full()
+        session.start()
+        await asyncio.gather(first, second)
+        await session.stop()
+        return session
+
+    session = run(main())
+    assert len(session.document) == 2
+
+
+def test_validator():
+    from delta.validate import Validator, ValidationError
+
+    async def main():
+        engine = Engine(validator=Validator(max_ops=10))
+        try:
+            await engine.submit('doc', 'a', 0, Delta().insert('abc'))
+            with pytest.raises(ValidationError):
+                await engine.submit('doc', 'a', 1, Delta([{'retain': -1}]))
+            with pytest.raises(ValidationError):
+                await engine.submit('doc', 'a', 1, Delta([{'insert': 'x'}] * 11))
+            with pytest.raises(ValidationError):
+                await engine.submit('doc', 'a', 1, Delta().retain(4).insert('!'))
+            assert await engine.submit('doc', 'a', 1, Delta().retain(3).insert('!')) == (2, Delta().retain(3).insert('!'))
+            return engine.session('doc').document
+        finally:
+            await engine.close()
+
+    assert run(main()) == Delta().insert('abc!')
+
+
+def test_broadcast_error():
+    async def broadcast(doc_id, client, revision, change):
+        raise ConnectionError("peer gone")
+
+    async def main():
+        session = Session('doc', broadcast=broadcast)
+        session.start()
+        first = await asyncio.wait_for(session.submit('a', 0, Delta().insert('A')), 1)
+        second = await asyncio.wait_for(session.submit('a', 1, Delta().retain(1).insert('B')), 1)
+        await session.stop()
+        return first, second, session.document
+
+    first, second, document = run(main())
+    assert first == (1, Delta().insert('A'))
+    assert second[0] == 2
+    assert document == Delta().insert('AB')
+
+
+def test_stop_cancels_queued():
+    async def main():
+        session = Session('doc', maxsize=1)
+        first = asyncio.ensure_future(session.submit('a', 0, Delta().insert('A')))
+        second = asyncio.ensure_future(session.submit('a', 0, Delta().insert('B')))
+        await asyncio.sleep(0)
+        await session.stop()
+        await asyncio.sleep(0)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(first, 1)
+        with pytest.raises(asyncio.CancelledError):
+            await asyncio.wait_for(second, 1)
+
+    run(main())
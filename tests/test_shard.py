@@ -0,0 +1,42 @@
+from delta import Delta
+from delta.shard import HashRing, ShardPool
+
+
+def test_ring():
+    ring = HashRing(['a', 'b', 'c'])
+    keys = ['doc-%d' % i for i in range(1000)]
+    before = dict((key, ring.get(key)) for key in keys)
+
+    assert len(ring) == 3
+    assert set(before.values()) == {'a', 'b', 'c'}
+    assert all(ring.get(key) == node for key, node in before.items())
+
+    ring.add('d')
+    after = dict((key, ring.get(key)) for key in keys)
+    moved = [key for key in keys if before[key] != after[key]]
+
+    # Only keys that now belong to the new node move
+    assert all(after[key] == 'd' for key in moved)
+    assert 0 < len(moved) < len(keys) / 2
+
+    ring.remove('d')
+    assert dict((key, ring.get(key)) for key in keys) == before
+
+
+def test_pool():
+    with ShardPool(workers=2) as pool:
+        for i in range(20):
+            assert pool.apply('doc-%d' % i, Delta().insert('Hello')) == 1
+            assert pool.apply('doc-%d' % i, Delta().retain(5).insert(str(i))) == 2
+
+        assert pool.document('doc-7') == (Delta().insert('Hello7'), 2)
+        assert len(set(pool.owners.values())) == 2
+
+        pool.add_worker()
+        assert len(set(pool.owners.values())) == 3
+        assert all(pool.owners[doc] == pool.ring.get(doc) for doc in pool.owners)
+
+        for i in range(20):
+            assert pool.document('doc-%d' % i) == (Delta().insert('Hello%d' % i), 2)
+        assert pool.apply('doc-7', Delta().retain(6).insert('!')) == 3
+        assert pool.document('doc-7') == (Delta().insert('Hello7!'), 3)
@@ -0,0 +1,59 @@
+import tracemalloc
+from delta import Delta
+from delta import trace
+
+
+def test_generate():
+    events = trace.generate(steps=300, clients=3, seed=1)
+
+    assert len(events) == 300
+    assert {e['client'] for e in events} == {'client-0', 'client-1', 'client-2'}
+    # Some edits were made against stale revisions
+    assert any(e['revision'] < i for i, e in enumerate(events))
+    assert events == trace.generate(steps=300, clients=3, seed=1)
+
+
+def test_replay():
+    events = trace.generate(steps=300, clients=3, seed=1)
+    document, report = trace.replay(events)
+
+    # The replayed document is a valid document ending in the initial newline
+    assert document.document().endswith('\n')
+    assert report['events'] == 300
+    assert report['length'] == len(document)
+    assert 0 < report['p50'] <= report['p90'] <= report['p99'] <= report['max']
+    assert report['peak_memory'] > 0
+
+    again, _ = trace.replay(events, memory=False)
+    assert again == document
+
+
+def test_save_load(tmp_path):
+    path = str(tmp_path / 'trace.jsonl')
+    events = trace.generate(steps=50, seed=2)
+    trace.save(events, path)
+
+    assert trace.load(path) == events
+
+
+def test_server():
+    server = trace.Server(Delta().insert('ac\n'))
+    server.apply(0, Delta().retain(1).insert('b'))
+    server.apply(0, Delta().retain(2).insert('d'))
+
+    assert server.document == Delta().insert('abcd\n')
+
+
+def test_replay_timed_without_tracing(monkeypatch):
+    events = trace.generate(steps=20, seed=3)
+    tracing = []
+    apply = trace.Server.apply
+    def spy(self, revision, change):
+        tracing.append(tracemalloc.is_tracing())
+        return apply(self, revision, change)
+    monkeypatch.setattr(trace.Server, 'apply', spy)
+
+    _, report = trace.replay(events)
+    # the timed pass runs untraced, memory is measured in a second pass
+    assert tracing == [False] * 20 + [True] * 20
+    assert report['peak_memory'] > 0
@@ -190,3 +190,73 @@ def test_delete_before_and_delete_across_position():
 
 
 
+
+def test_opposite_ends():
+    a = Delta().insert('A')
+    b = Delta().retain(10 ** 9).insert('B', bold=True).retain(3, italic=True).delete(1)
+
+    assert a.transform(b, True) == Delta().retain(10 ** 9 + 1).insert('B', bold=True).retain(3, italic=True).delete(1)
+    assert b.transform(a, True) == Delta().insert('A')
+
+def test_convergence():
+    document = Delta().insert('Hello World\n', bold=True).insert('Second line\n')
+    changes = [
+        Delta().retain(3).insert('XYZ').delete(2),
+        Delta().retain(5, italic=True).retain(8).delete(3).insert('!'),
+        Delta().delete(20),
+        Delta().retain(20).insert('end'),
+        Delta().retain(6, bold=None).retain(2, color='red'),
+    ]
+    for a in changes:
+        for b in changes:
+            left = document.compose(a).compose(a.transform(b, True))
+            right = document.compose(b).compose(b.transform(a, False))
+            assert left == right
+
+
+def test_rest_not_shared():
+    a = Delta().insert('A')
+    b = Delta().retain(1).retain(2, bold=True).retain(3, italic=True)
+    result = a.transform(b, True)
+    result.ops[-1]['attributes']['color'] = 'red'
+    assert b == Delta().retain(1).retain(2, bold=True).retain(3, italic=True)
+
+
+def test_rest_merges_at_seam():
+    a = Delta().retain(1).delete(1)
+    b = Delta().delete(1).retain(1).insert('x').delete(1)
+    assert a.transform(b, True).ops == [{'insert': 'x'}, {'delete': 2}]
+
+
+def test_results_canonical():
+    import random
+    rng = random.Random(2)
+
+    def random_change(length):
+        change = Delta()
+        while length > 0 or rng.random() < 0.3:
+            kind = rng.choice(['retain', 'format', 'delete', 'insert'])
+            if kind == 'insert' or length == 0:
+                change.insert(rng.choice('xy'), **rng.choice([{}, {'bold': True}]))
+                continue
+            step = rng.randint(1, length)
+            if kind == 'retain':
+                change.retain(step)
+            elif kind == 'format':
+                change.retain(step, bold=True)
+            else:
+                change.delete(step)
+            length -= step
+        return change
+
+    for _ in range(5000):
+        # a change may end early, leaving the rest of the document alone
+        length = rng.randint(0, 6)
+        a, b = random_change(rng.randint(0, length)), random_change(length)
+        if rng.random() < 0.5:
+            a, b = b, a
+        for result in (a.transform(b, True), a.transform(b, False)):
+            canonical = Delta()
+            for operator in result.ops:
+                canonical.push(operator)
+            assert result.ops == canonical.ops, (a, b)
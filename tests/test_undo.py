@@ -0,0 +1,76 @@
+from delta import Delta
+from delta.undo import UndoManager
+
+
+def apply(manager, document, change, timestamp):
+    manager.record(change, document, timestamp)
+    return document.compose(change)
+
+
+def test_undo_redo():
+    manager = UndoManager(delay=1)
+    original = Delta().insert('Hello\n')
+    document = apply(manager, original, Delta().retain(5).insert(' World'), 0)
+    document = apply(manager, document, Delta().retain(11).insert('!'), 10)
+
+    undo = manager.undo()
+    assert undo == Delta().retain(11).delete(1)
+    document = document.compose(undo)
+    assert document == Delta().insert('Hello World\n')
+
+    document = document.compose(manager.undo())
+    assert document == original
+    assert manager.undo() is None
+
+    document = document.compose(manager.redo())
+    document = document.compose(manager.redo())
+    assert document == Delta().insert('Hello World!\n')
+    assert manager.redo() is None
+
+
+def test_merge_within_delay():
+    manager = UndoManager(delay=1)
+    original = Delta().insert('\n')
+    document = original
+    for i, char in enumerate('abc'):
+        document = apply(manager, document, Delta().retain(i).insert(char), i * 0.1)
+
+    assert len(manager.undo_stack) == 1
+    assert document.compose(manager.undo()) == original
+
+
+def test_new_record_clears_redo():
+    manager = UndoManager(delay=0)
+    document = apply(manager, Delta().insert('\n'), Delta().insert('a'), 0)
+    manager.undo()
+    assert manager.redo_stack
+    apply(manager, document, Delta().insert('b'), 1)
+    assert not manager.redo_stack
+
+
+def test_transform():
+    manager = UndoManager(delay=0)
+    document = apply(manager, Delta().insert('Hello\n'), Delta().retain(5).insert('!'), 0)
+
+    # Someone else inserts at the beginning
+    remote = Delta().insert('>> ')
+    document = document.compose(remote)
+    manager.transform(remote)
+
+    document = document.compose(manager.undo())
+    assert document == Delta().insert('>> Hello\n')
+
+
+def test_limits():
+    manager = UndoManager(delay=0, max_stack=2)
+    document = Delta().insert('\n')
+    for i in range(5):
+        document = apply(manager, document, Delta().insert('a'), i)
+    assert len(manager.undo_stack) == 2
+
+    manager = UndoManager(delay=0, max_ops=6)
+    document = Delta().insert('\n')
+    for i in range(5):
+        document = apply(manager, document, Delta().retain(i).insert('a'), i)
+    assert sum(len(e['undo'].ops) + len(e['redo'].ops) for e in manager.undo_stack) <= 6
+    assert len(manager.undo_stack) == 1
@@ -0,0 +1,106 @@
+import pytest
+
+from delta import Delta, metrics
+from delta.validate import Validator, ValidationError, QUILL_ATTRIBUTES, validate, compile_rule, size_of
+
+
+def test_valid():
+    delta = Delta().retain(2, bold=True).insert('a', link='x').insert({'image': 'a.png'}).delete(3)
+    assert validate(delta) is delta
+    assert validate(delta.ops) is delta.ops
+    assert validate(delta, base=5)
+    assert validate(Delta().insert('ab\n', header=1), document=True, validator=Validator(QUILL_ATTRIBUTES))
+
+
+@pytest.mark.parametrize('ops, message', [
+    ({'ops': []}, 'must be a list'),
+    (['insert'], 'op 0: expected a dict'),
+    ([{'insert': 'a'}, {}], 'op 1: no insert'),
+    ([{'insert': 'a', 'delete': 1}], 'unexpected keys: delete'),
+    ([{'insert': 'a', 'attribute': {}}], 'unexpected keys: attribute'),
+    ([{'insert': ''}], 'empty insert'),
+    ([{'insert': {}}], 'empty embed'),
+    ([{'insert': 5}], 'insert must be'),
+    ([{'retain': None}], 'retain must be an integer, not NoneType'),
+    ([{'retain': True}], 'retain must be an integer, not bool'),
+    ([{'retain': 1.5}], 'retain must be an integer'),
+    ([{'delete': -1}], 'delete must be positive'),
+    ([{'retain': 0}], 'retain must be positive'),
+    ([{'delete': 1, 'attributes': {'bold': True}}], "delete can't have attributes"),
+    ([{'insert': 'a', 'attributes': ['bold']}], 'attributes must be a dict'),
+    ([{'insert': 'a', 'attributes': {1: True}}], 'is not a string'),
+    ([{'insert': 'a', 'attributes': {'bold': object()}}], 'not a JSON value'),
+])
+def test_invalid(ops, message):
+    with pytest.raises(ValidationError) as e:
+        validate(ops)
+    assert message in str(e.value)
+
+
+def test_base():
+    validate(Delta().retain(3).delete(2), base=5)
+    validate(Delta().retain(3).insert('abc'), base=Delta().insert('abc'))
+    with pytest.raises(ValidationError):
+        validate(Delta().retain(3).delete(3), base=5)
+    with pytest.raises(ValidationError):
+        validate(Delta().retain(1), document=True)
+
+
+def test_limits():
+    validator = Validator(max_ops=3, max_insert=5, max_attributes=2, max_attribute_size=10)
+    validator.validate(Delta().insert('abcde', a=1, b=2))
+    with pytest.raises(ValidationError, match='4 ops'):
+        validator.validate(Delta([{'retain': 1}] * 4))
+    with pytest.raises(ValidationError, match='5 characters'):
+        validator.validate(Delta().insert('abc').retain(1).insert('abc'))
+    with pytest.raises(ValidationError, match='3 attributes'):
+        validator.validate(Delta().insert('a', a=1, b=2, c=3))
+    with pytest.raises(ValidationError, match='larger than 10'):
+        validator.validate(Delta().insert('a', link='http://example.com'))
+    with pytest.raises(ValidationError, match='larger than 10'):
+        validator.validate(Delta().insert({'image': 'http://example.com'}))
+    with pytest.raises(ValidationError, match='nested'):
+        nested = {}
+        for i in range(20):
+            nested = {'a': nested}
+        Validator().validate(Delta().insert('a', x=nested))
+    Validator(max_ops=None, max_insert=None).validate(Delta([{'insert': 'a'}] * 20000))
+
+
+def test_schema():
+    validator = Validator(QUILL_ATTRIBUTES, unknown=False)
+    validator.validate(Delta().insert('a', bold=True, script='sub', link={'href': 'x'}).retain(1, bold=None))
+    validator.validate(Delta().insert('\n', header=2, list='bullet', indent=3))
+    for attrs in [{'bold': 1}, {'header': True}, {'header': 7}, {'script': 'middle'}, {'indent': '1'},
+                  {'list': ['ordered']}, {'foo': 1}]:
+        with pytest.raises(ValidationError):
+            validator.validate(Delta().insert('a', **attrs))
+    Validator(QUILL_ATTRIBUTES).validate(Delta().insert('a', foo=1))
+
+
+def test_compile_rule():
+    assert compile_rule(None)(object())
+    assert compile_rule(int)(3) and not compile_rule(int)(True)
+    assert compile_rule(bool)(True) and not compile_rule(bool)(1)
+    assert compile_rule(['a', 'b'])('a') and not compile_rule(['a'])({})
+    assert compile_rule(lambda v: v > 2)(3)
+    with pytest.raises(TypeError):
+        compile_rule(3)
+
+
+def test_size_of():
+    assert size_of('abc', 100) == 3
+    assert size_of({'ab': [1, 'cd']}, 100) == 5
+    assert size_of(['x' * 10] * 100, 20) <= 30
+
+
+def test_metrics():
+    metrics.reset()
+    metrics.enable()
+    try:
+        with pytest.raises(ValidationError):
+            validate([{'retain': -1}])
+        assert metrics.snapshot()['validate.errors'] == 1
+    finally:
+        metrics.disable()
+        metrics.reset()